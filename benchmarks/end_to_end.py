@@ -0,0 +1,239 @@
+"""
+Offline end-to-end benchmark of the bot's article pipeline and !post_twitter.
+Runs main.process_article and the post_twitter command against local fakes of
+OpenAI, Airtable, X, article pages and a Discord channel, and reports
+p50/p95/p99 latency per stage and articles per minute at each concurrency level.
+
+Usage: python benchmarks/end_to_end.py --articles 20 --concurrency 1,4,8
+"""
+
+import argparse
+import asyncio
+import functools
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fakes import (  # noqa: E402
+    FakeAirtable,
+    FakeArticles,
+    FakeChannel,
+    FakeContext,
+    FakeOpenAI,
+    FakeX,
+    RedirectAdapter,
+)
+
+
+def percentile(values, p: float):
+    """
+    Nearest-rank percentile of `values`, e.g. p=95.
+    """
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(p / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def configure_environment(fakes, data_dir: str, engine: str = "assistants"):
+    """
+    Point the app at the fakes and at throwaway local storage. Must run before
+    anything under src is imported, since config reads the environment then.
+    """
+    os.environ.update(
+        {
+            "ENV": "cloud",
+            "DISCORD_TOKEN": "benchmark",
+            "CHANNEL_ID": "1",
+            "OPENAI_API_KEY": "benchmark",
+            "OPENAI_BASE_URL": f"{fakes['openai'].url}/v1",
+            "AIRTABLE_API_KEY": "benchmark",
+            "AIRTABLE_BASE_ID": "benchmark",
+            "TWITTER_API_KEY": "benchmark",
+            "TWITTER_API_SECRET": "benchmark",
+            "TWITTER_ACCESS_TOKEN": "benchmark",
+            "TWITTER_ACCESS_TOKEN_SECRET": "benchmark",
+            "TWITTER_BEARER_TOKEN": "benchmark",
+            "CACHE_DIR": os.path.join(data_dir, "cache"),
+            "IMAGE_STORE_DIR": os.path.join(data_dir, "images"),
+            "JOB_QUEUE_PATH": os.path.join(data_dir, "jobs.sqlite3"),
+            "CONTENT_ENGINE_X": engine,
+        }
+    )
+    # measure posting itself rather than the configured posting pace
+    os.environ.setdefault("TWITTER_POSTS_PER_MINUTE", "60000")
+
+
+def connect_fakes(fakes):
+    """
+    Route the Airtable and X sessions, whose hosts are fixed, to the fakes.
+    """
+    from src.handlers import airtable_manager, social_media_poster
+    from src.utils.config import WORKER_POOL_SIZE
+
+    for table in ("article", "content"):
+        airtable_manager._get_table(table).session.mount(
+            "https://api.airtable.com",
+            RedirectAdapter(fakes["airtable"].url, pool_maxsize=WORKER_POOL_SIZE),
+        )
+    poster = social_media_poster.get_twitter_poster()
+    poster.client.session.mount(
+        "https://api.twitter.com", RedirectAdapter(fakes["x"].url)
+    )
+    poster.api.session.mount(
+        "https://upload.twitter.com", RedirectAdapter(fakes["x"].url)
+    )
+
+
+def instrument(timings):
+    """
+    Wrap the handler calls made by the bot so each one's duration is recorded.
+    """
+    from src import main
+    from src.handlers import (
+        airtable_manager,
+        article_processor,
+        image_generator,
+        social_media_poster,
+    )
+
+    def timed(stage, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timings[stage].append(time.perf_counter() - start)
+
+        return wrapper
+
+    for module, name, stage in [
+        (article_processor, "process_article", "fetch+extract"),
+        (airtable_manager, "save_to_airtable", "save article"),
+        (main, "generate_platform_content", "generate content"),
+        (image_generator, "generate_image", "generate image"),
+        (airtable_manager, "save_many_to_airtable", "save content (batch)"),
+        (airtable_manager, "get_content_with_article", "post: lookup"),
+        (social_media_poster, "post_to_twitter", "post: tweet"),
+        (airtable_manager, "update_content_status", "post: mark posted"),
+    ]:
+        setattr(module, name, timed(stage, getattr(module, name)))
+
+
+async def run_level(concurrency, n_articles, fakes, timings, level):
+    """
+    Process `n_articles` and post the content they produce, `concurrency` at a time.
+    Return (article wall time, post wall time, number of content records).
+    """
+    from src import main
+
+    channel = FakeChannel()
+    semaphore = asyncio.Semaphore(concurrency)
+    content_table = fakes["airtable"].tables.setdefault("Post Content", {})
+    existing = set(content_table)
+
+    async def article(i):
+        async with semaphore:
+            start = time.perf_counter()
+            await main.process_article(channel, f"{fakes['articles'].url}/{level}/{i}")
+            timings["article total"].append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(article(i) for i in range(n_articles)))
+    article_wall = time.perf_counter() - start
+
+    # process_article waits for its buffered content writes, so they have landed
+    content_ids = [
+        record_id for record_id in content_table if record_id not in existing
+    ]
+
+    async def post(content_id):
+        async with semaphore:
+            start = time.perf_counter()
+            await main.post_twitter.callback(FakeContext(channel), content_id)
+            timings["post total"].append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(post(content_id) for content_id in content_ids))
+    post_wall = time.perf_counter() - start
+    return article_wall, post_wall, len(content_ids), channel
+
+
+def report(
+    concurrency, n_articles, article_wall, post_wall, n_content, channel, timings
+):
+    print(
+        f"\nconcurrency {concurrency}: {n_articles} articles in {article_wall:.1f}s "
+        f"({n_articles / article_wall * 60:.1f} articles/min, "
+        f"{n_content} content records), {n_content} posts in {post_wall:.1f}s, "
+        f"{channel.sends} Discord sends and {channel.edits} edits"
+    )
+    print(f"  {'stage':<24}{'n':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, values in timings.items():
+        if values:
+            print(
+                f"  {stage:<24}{len(values):>5}"
+                + "".join(
+                    f"{percentile(values, p) * 1000:>10.0f}" for p in (50, 95, 99)
+                )
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark.")
+    parser.add_argument("--articles", type=int, default=20, help="articles per level")
+    parser.add_argument(
+        "--concurrency", default="1,4,8", help="comma-separated concurrency levels"
+    )
+    parser.add_argument("--openai-latency", type=float, default=0.3, help="seconds")
+    parser.add_argument("--airtable-latency", type=float, default=0.1, help="seconds")
+    parser.add_argument("--x-latency", type=float, default=0.2, help="seconds")
+    parser.add_argument("--page-latency", type=float, default=0.1, help="seconds")
+    parser.add_argument(
+        "--jitter", type=float, default=0.25, help="latency jitter as a fraction"
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="fraction of failed requests"
+    )
+    parser.add_argument(
+        "--engine",
+        choices=["assistants", "chat"],
+        default="assistants",
+        help="content generation engine",
+    )
+    args = parser.parse_args()
+
+    def service(cls, latency):
+        return cls(
+            latency=latency, jitter=latency * args.jitter, error_rate=args.error_rate
+        )
+
+    fakes = {
+        "openai": service(FakeOpenAI, args.openai_latency),
+        "airtable": service(FakeAirtable, args.airtable_latency),
+        "x": service(FakeX, args.x_latency),
+        # article pages don't fail, so every article reaches the pipeline
+        "articles": FakeArticles(latency=args.page_latency),
+    }
+    data_dir = tempfile.mkdtemp(prefix="benchmark-")
+    configure_environment(fakes, data_dir, args.engine)
+    connect_fakes(fakes)
+
+    timings = defaultdict(list)
+    instrument(timings)
+    for level, concurrency in enumerate(int(c) for c in args.concurrency.split(",")):
+        timings.clear()
+        results = asyncio.run(
+            run_level(concurrency, args.articles, fakes, timings, level)
+        )
+        report(concurrency, args.articles, *results, timings)
+
+    print(
+        "\nrequests served: "
+        + ", ".join(f"{name} {fake.requests}" for name, fake in fakes.items())
+    )
@@ -0,0 +1,408 @@
+"""
+Local stand-ins for the services the pipeline talks to, for offline benchmarks.
+Each fake is an HTTP server on 127.0.0.1 with configurable latency and error
+rate; FakeChannel stands in for a Discord channel.
+"""
+
+import base64
+import io
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from requests.adapters import HTTPAdapter
+
+
+class FakeService:
+    """
+    Threaded HTTP server answering requests through `route`, after sleeping
+    `latency` seconds (+/- `jitter`) and failing `error_rate` of them with a 500.
+    """
+
+    def __init__(
+        self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _handle(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                service._serve(self, body)
+
+            do_GET = do_POST = do_PATCH = do_DELETE = _handle
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def next_id(self, prefix: str):
+        return f"{prefix}{next(self._ids)}"
+
+    def _serve(self, handler, body):
+        with self._lock:
+            self.requests += 1
+        time.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+        if random.random() < self.error_rate:
+            status, headers, payload = 500, {}, {"error": "injected failure"}
+        else:
+            parts = urlsplit(handler.path)
+            try:
+                data = json.loads(body) if body.startswith(b"{") else {}
+            except ValueError:
+                data = {}
+            status, headers, payload = self.route(
+                handler.command, parts.path, parse_qs(parts.query), data
+            )
+        if isinstance(payload, bytes):
+            content, content_type = payload, headers.pop("Content-Type", "text/html")
+        else:
+            content, content_type = json.dumps(payload).encode(), "application/json"
+        handler.send_response(status)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("Content-Length", str(len(content)))
+        for name, value in headers.items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        handler.wfile.write(content)
+
+    def route(self, method, path, query, data):
+        raise NotImplementedError
+
+    def close(self):
+        self.server.shutdown()
+
+
+def _tiny_png():
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64), (40, 120, 200)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class FakeOpenAI(FakeService):
+    """
+    The chat completions, assistants, threads, runs and images endpoints the
+    handlers use. Runs complete as soon as they are created.
+    """
+
+    def __init__(self, content_length: int = 200, **kwargs):
+        super().__init__(**kwargs)
+        self.content_length = content_length
+        self.image = base64.b64encode(_tiny_png()).decode("ascii")
+        self.assistants = []
+
+    def route(self, method, path, query, data):
+        path = path.removeprefix("/v1")
+        if path == "/chat/completions":
+            if data.get("stream"):
+                return (
+                    200,
+                    {"Content-Type": "text/event-stream"},
+                    self._completion_chunks(data),
+                )
+            return 200, {}, self._completion(data)
+        if path == "/assistants":
+            if method == "GET":
+                return (
+                    200,
+                    {},
+                    {"object": "list", "data": self.assistants, "has_more": False},
+                )
+            assistant = {"id": self.next_id("asst_"), "object": "assistant", **data}
+            self.assistants.append(assistant)
+            return 200, {}, assistant
+        if path == "/threads":
+            return 200, {}, {"id": self.next_id("thread_"), "object": "thread"}
+        match = re.fullmatch(r"/threads/([^/]+)/(messages|runs)(?:/([^/]+))?", path)
+        if match:
+            thread_id, kind, _ = match.groups()
+            if kind == "runs":
+                if data.get("stream"):
+                    return (
+                        200,
+                        {"Content-Type": "text/event-stream"},
+                        self._run_events(thread_id),
+                    )
+                return 200, {}, self._run(thread_id)
+            if method == "GET":
+                return 200, {}, {"object": "list", "data": [self._message(thread_id)]}
+            return 200, {}, self._message(thread_id)
+        if path == "/images/generations":
+            return (
+                200,
+                {},
+                {"created": int(time.time()), "data": [{"b64_json": self.image}]},
+            )
+        return 404, {}, {"error": {"message": f"no fake for {method} {path}"}}
+
+    def _completion(self, data):
+        if data.get("response_format", {}).get("type") == "json_object":
+            # article extraction; vary the summary so each article gets its own image
+            article_id = self.next_id("article-")
+            content = json.dumps(
+                {
+                    "title": f"Benchmark article {article_id}",
+                    "source": "Benchmark News",
+                    "summary": f"Summary of {article_id}.",
+                    "text": "Benchmark article text. " * 20,
+                }
+            )
+            choices = [content]
+        elif data.get("n", 1) > 1:
+            choices = ["A shortened benchmark post."] * data["n"]
+        else:
+            # content generation with the chat engine
+            choices = [
+                ("Benchmark post about the article. " * 10)[: self.content_length]
+            ]
+        return {
+            "id": self.next_id("chatcmpl-"),
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": data.get("model"),
+            "choices": [
+                {
+                    "index": i,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": content},
+                }
+                for i, content in enumerate(choices)
+            ],
+            "usage": {
+                "prompt_tokens": 500,
+                "completion_tokens": 60,
+                "total_tokens": 560,
+            },
+        }
+
+    def _completion_chunks(self, data):
+        """
+        Server-sent events for a streamed chat completion, a few words per chunk.
+        """
+        completion = self._completion(data)
+        text = completion["choices"][0]["message"]["content"]
+        words = text.split(" ")
+        pieces = [" ".join(words[i : i + 5]) + " " for i in range(0, len(words), 5)]
+        chunk = {key: completion[key] for key in ("id", "created", "model")}
+        chunk["object"] = "chat.completion.chunk"
+        events = [
+            {
+                **chunk,
+                "choices": [{"index": 0, "delta": {"content": piece}}],
+            }
+            for piece in pieces
+        ]
+        events.append(
+            {
+                **chunk,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            }
+        )
+        if data.get("stream_options", {}).get("include_usage"):
+            events.append({**chunk, "choices": [], "usage": completion["usage"]})
+        body = "".join(f"data: {json.dumps(event)}\n\n" for event in events)
+        return (body + "data: [DONE]\n\n").encode()
+
+    def _run(self, thread_id):
+        return {
+            "id": self.next_id("run_"),
+            "object": "thread.run",
+            "thread_id": thread_id,
+            "status": "completed",
+        }
+
+    def _run_events(self, thread_id):
+        """
+        Server-sent events for a streamed run that writes one message.
+        """
+        run = self._run(thread_id)
+        message = self._message(thread_id)
+        text = message["content"][0]["text"]["value"]
+        delta = {
+            "id": message["id"],
+            "object": "thread.message.delta",
+            "delta": {
+                "content": [{"index": 0, "type": "text", "text": {"value": text}}]
+            },
+        }
+        events = [
+            ("thread.run.created", {**run, "status": "queued"}),
+            (
+                "thread.message.created",
+                {**message, "content": [], "status": "in_progress"},
+            ),
+            ("thread.message.delta", delta),
+            ("thread.message.completed", {**message, "status": "completed"}),
+            ("thread.run.completed", run),
+        ]
+        body = "".join(
+            f"event: {event}\ndata: {json.dumps(data)}\n\n" for event, data in events
+        )
+        return (body + "event: done\ndata: [DONE]\n\n").encode()
+
+    def _message(self, thread_id):
+        text = ("Benchmark post about the article. " * 10)[: self.content_length]
+        return {
+            "id": self.next_id("msg_"),
+            "object": "thread.message",
+            "thread_id": thread_id,
+            "role": "assistant",
+            "content": [{"type": "text", "text": {"value": text, "annotations": []}}],
+        }
+
+
+class FakeAirtable(FakeService):
+    """
+    Airtable's record endpoints, keeping records in memory.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.tables = {}
+
+    def _create(self, table, fields):
+        record = {"id": self.next_id("rec"), "fields": fields, "createdTime": ""}
+        self.tables.setdefault(table, {})[record["id"]] = record
+        return record
+
+    def route(self, method, path, query, data):
+        parts = [unquote(part) for part in path.strip("/").split("/")]
+        table = self.tables.setdefault(parts[2], {})
+        record_id = parts[3] if len(parts) > 3 else None
+
+        if method == "POST":
+            if "records" in data:
+                records = [self._create(parts[2], r["fields"]) for r in data["records"]]
+                return 200, {}, {"records": records}
+            return 200, {}, self._create(parts[2], data["fields"])
+        if method == "PATCH":
+            updates = (
+                data["records"] if "records" in data else [{"id": record_id, **data}]
+            )
+            for update in updates:
+                table[update["id"]]["fields"].update(update["fields"])
+            records = [table[update["id"]] for update in updates]
+            return 200, {}, {"records": records} if "records" in data else records[0]
+        if record_id:
+            if record_id not in table:
+                return 404, {}, {"error": "NOT_FOUND"}
+            return 200, {}, table[record_id]
+        # formulas aren't evaluated; listing returns every record
+        return 200, {}, {"records": list(table.values())}
+
+
+class FakeX(FakeService):
+    """
+    X's tweet and media upload endpoints, with rate-limit headers.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.tweets = []
+
+    def route(self, method, path, query, data):
+        headers = {
+            "x-rate-limit-limit": "10000",
+            "x-rate-limit-remaining": "9999",
+            "x-rate-limit-reset": str(int(time.time()) + 900),
+        }
+        if path == "/2/tweets":
+            self.tweets.append(data)
+            tweet_id = self.next_id("")
+            return 201, headers, {"data": {"id": tweet_id, "text": data.get("text")}}
+        if path == "/1.1/media/upload.json":
+            media_id = int(self.next_id(""))
+            return (
+                200,
+                headers,
+                {"media_id": media_id, "media_id_string": str(media_id)},
+            )
+        return 404, headers, {"errors": [{"message": f"no fake for {path}"}]}
+
+
+class FakeArticles(FakeService):
+    """
+    Article pages with a few paragraphs of text.
+    """
+
+    def route(self, method, path, query, data):
+        paragraphs = "".join(
+            f"<p>Paragraph {i} of {path}, long enough to count as article text.</p>"
+            for i in range(30)
+        )
+        html = f"<html><head><title>{path}</title></head><body><article>{paragraphs}</article></body></html>"
+        return 200, {"Content-Type": "text/html"}, html.encode()
+
+
+class RedirectAdapter(HTTPAdapter):
+    """
+    requests adapter that sends every request to `target` instead, keeping the path.
+    Mount it on a session for a real API host to point that session at a fake.
+    """
+
+    def __init__(self, target: str, **kwargs):
+        super().__init__(**kwargs)
+        self.target = target
+
+    def send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        request.url = (
+            self.target + parts.path + (f"?{parts.query}" if parts.query else "")
+        )
+        return super().send(request, **kwargs)
+
+
+class FakeMessage:
+    def __init__(self, channel):
+        self.channel = channel
+
+    async def edit(self, content=None, embed=None, attachments=None):
+        self.channel.edits += 1
+
+
+class FakeChannel:
+    """
+    Discord channel that counts the messages sent and edited through it.
+    """
+
+    def __init__(self, channel_id: int = 1):
+        self.id = channel_id
+        self.sends = 0
+        self.edits = 0
+        self.last_content = None
+
+    async def send(self, content=None, embed=None, file=None):
+        self.sends += 1
+        self.last_content = content
+        return FakeMessage(self)
+
+
+class FakeContext:
+    """
+    Command context for calling bot commands directly.
+    """
+
+    def __init__(self, channel: FakeChannel):
+        self.channel = channel
+
+    async def send(self, content=None, **kwargs):
+        return await self.channel.send(content, **kwargs)
@@ -0,0 +1,69 @@
+"""
+Measure how long each entry point takes to import, as a proxy for Lambda cold
+starts and bot startup. Each target is imported in a fresh interpreter.
+
+Usage: python benchmarks/import_time.py [--runs N]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# target name -> code run in a fresh interpreter
+TARGETS = {
+    "python": "pass",
+    "config": "import src.utils.config",
+    "article_processor": "from src.handlers.article_processor import lambda_handler",
+    "content_generator": "from src.handlers.content_generator import lambda_handler",
+    "image_generator": "from src.handlers.image_generator import lambda_handler",
+    "airtable_manager": "from src.handlers.airtable_manager import lambda_handler",
+    "social_media_poster": "from src.handlers.social_media_poster import lambda_handler",
+    "bot": "import src.main",
+}
+
+# placeholder credentials, so the benchmark runs without a .env file
+PLACEHOLDER_ENV = {
+    "ENV": "cloud",
+    "DISCORD_TOKEN": "benchmark",
+    "CHANNEL_ID": "1",
+    "OPENAI_API_KEY": "benchmark",
+    "AIRTABLE_API_KEY": "benchmark",
+    "AIRTABLE_BASE_ID": "benchmark",
+    "TWITTER_API_KEY": "benchmark",
+    "TWITTER_API_SECRET": "benchmark",
+    "TWITTER_ACCESS_TOKEN": "benchmark",
+    "TWITTER_ACCESS_TOKEN_SECRET": "benchmark",
+    "TWITTER_BEARER_TOKEN": "benchmark",
+}
+
+
+def time_import(code: str, runs: int):
+    """
+    Return the import times of `code` in seconds, one per fresh interpreter.
+    """
+    env = {**PLACEHOLDER_ENV, **os.environ}
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, check=True)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark import times.")
+    parser.add_argument("--runs", type=int, default=10, help="imports per target")
+    args = parser.parse_args()
+
+    print(f"{'target':<22}{'median ms':>12}{'min ms':>10}")
+    for name, code in TARGETS.items():
+        times = time_import(code, args.runs)
+        print(
+            f"{name:<22}{statistics.median(times) * 1000:>12.0f}"
+            f"{min(times) * 1000:>10.0f}"
+        )
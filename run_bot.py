@@ -1,5 +1,15 @@
 from src.main import bot
-from src.utils.config import DISCORD_TOKEN
+from src.utils.metrics import start_metrics_server
+from src.utils.config import (
+    DISCORD_TOKEN,
+    DISCORD_VARS,
+    OPENAI_VARS,
+    AIRTABLE_VARS,
+    require_env,
+)
 
 if __name__ == "__main__":
+    # X keys are only needed once something is posted
+    require_env(*DISCORD_VARS, *OPENAI_VARS, *AIRTABLE_VARS)
+    start_metrics_server()
     bot.run(DISCORD_TOKEN)
@@ -0,0 +1,39 @@
+import argparse
+
+from src.pipeline import run_articles
+from src.utils.config import (
+    BULK_CONCURRENCY,
+    OPENAI_VARS,
+    AIRTABLE_VARS,
+    require_env,
+)
+from src.utils.urls import extract_urls, dedupe_urls
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Process many article URLs at once.")
+    parser.add_argument("urls", nargs="*", help="article URLs")
+    parser.add_argument("--file", help="text file with one URL per line")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=BULK_CONCURRENCY,
+        help="number of articles processed at once",
+    )
+    args = parser.parse_args()
+    require_env(*OPENAI_VARS, *AIRTABLE_VARS)
+
+    text = " ".join(args.urls)
+    if args.file:
+        with open(args.file, "r") as file:
+            text += "\n" + file.read()
+    urls = dedupe_urls(extract_urls(text))
+    print(f"Processing {len(urls)} articles")
+
+    failed = 0
+    for url, result in run_articles(urls, args.concurrency):
+        if isinstance(result, Exception):
+            failed += 1
+            print(f"{url}: Error: {str(result)}")
+        else:
+            print(f"{url}: {result['content_record_ids']}")
+    print(f"{len(urls) - failed} done, {failed} failed")
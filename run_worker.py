@@ -0,0 +1,15 @@
+import argparse
+
+from src.worker import run_workers
+from src.utils.config import JOB_WORKERS
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Process queued article jobs.")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=JOB_WORKERS,
+        help="number of worker processes",
+    )
+    args = parser.parse_args()
+    run_workers(args.workers)
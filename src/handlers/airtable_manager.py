@@ -1,12 +1,140 @@
 import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
 from airtable import Airtable
+from requests.adapters import HTTPAdapter
 
 from ..utils.config import (
     AIRTABLE_API_KEY,
     AIRTABLE_BASE_ID,
     AIRTABLE_ARTICLE_TABLE_NAME,
     AIRTABLE_CONTENT_TABLE_NAME,
+    AIRTABLE_REQUESTS_PER_SECOND,
+    AIRTABLE_TIMEOUT,
+    AIRTABLE_MAX_RETRIES,
+    AIRTABLE_BATCH_SIZE,
+    AIRTABLE_WRITE_BUFFER_DELAY,
+    AIRTABLE_RECORD_CACHE_TTL,
+    AIRTABLE_RECORD_CACHE_MAX_ENTRIES,
+    AIRTABLE_VARS,
+    WORKER_POOL_SIZE,
+    require_env,
 )
+from ..utils import metrics
+from ..utils.rate_limit import RateLimiter
+
+# Airtable rate limits per base, so every table client shares one limiter
+_rate_limiter = RateLimiter(AIRTABLE_REQUESTS_PER_SECOND)
+
+# One long-lived client (and keep-alive session) per table, created on first use
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+# Read-through cache of record fields keyed by (table, record ID), filled by
+# reads and inserts and invalidated by updates. Only articles are cached: their
+# fields don't change, while content is edited in Airtable during review and
+# must always be read fresh before posting
+CACHED_TABLES = {"article"}
+_records = OrderedDict()
+_records_lock = threading.Lock()
+
+
+def _cache_get(table: str, record_id: str):
+    if table not in CACHED_TABLES:
+        return None
+    with _records_lock:
+        entry = _records.get((table, record_id))
+        if entry is not None and entry[1] < time.monotonic():
+            del _records[(table, record_id)]
+            entry = None
+        if entry is not None:
+            _records.move_to_end((table, record_id))
+    metrics.cache_lookup("airtable_record", entry is not None)
+    return dict(entry[0]) if entry is not None else None
+
+
+def _cache_set(table: str, record):
+    if table not in CACHED_TABLES:
+        return
+    with _records_lock:
+        _records[(table, record["id"])] = (
+            record["fields"],
+            time.monotonic() + AIRTABLE_RECORD_CACHE_TTL,
+        )
+        _records.move_to_end((table, record["id"]))
+        while len(_records) > AIRTABLE_RECORD_CACHE_MAX_ENTRIES:
+            _records.popitem(last=False)
+
+
+def _cache_invalidate(table: str, record_id: str):
+    with _records_lock:
+        _records.pop((table, record_id), None)
+
+
+class _PooledAirtable(Airtable):
+    """
+    Airtable client with a pooled keep-alive session that paces requests through
+    the shared per-base rate limiter and backs off on 429 responses.
+    """
+
+    # pacing is handled by the shared rate limiter rather than per-call sleeps
+    API_LIMIT = 0
+    MAX_RECORDS_PER_REQUEST = AIRTABLE_BATCH_SIZE
+
+    def __init__(self, base_id, table_name, api_key, timeout=None):
+        super().__init__(base_id, table_name, api_key=api_key, timeout=timeout)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=WORKER_POOL_SIZE)
+        self.session.mount("https://", adapter)
+
+    def _request(self, method, url, params=None, json_data=None):
+        # Airtable sends no quota headers, so headroom shows as time spent
+        # waiting for the shared limiter and as 429 responses
+        for attempt in range(AIRTABLE_MAX_RETRIES + 1):
+            metrics.observe(
+                "rate_limit_wait_seconds", _rate_limiter.acquire(), service="airtable"
+            )
+            with metrics.span("airtable", method=method, table=self.table_name):
+                response = self.session.request(
+                    method, url, params=params, json=json_data, timeout=self.timeout
+                )
+            metrics.inc(
+                "airtable_responses_total",
+                method=method,
+                status=response.status_code,
+            )
+            if response.status_code != 429 or attempt == AIRTABLE_MAX_RETRIES:
+                break
+            # Airtable asks clients to wait 30 seconds after exceeding the limit
+            retry_after = float(response.headers.get("Retry-After", 30))
+            print(f"Airtable rate limit hit, retrying in {retry_after}s")
+            _rate_limiter.pause(retry_after)
+        return self._process_response(response)
+
+
+def _get_table(table: str):
+    """
+    Return the shared client for the given table ("article" or "content").
+    """
+    if table == "article":
+        table_name = AIRTABLE_ARTICLE_TABLE_NAME
+    elif table == "content":
+        table_name = AIRTABLE_CONTENT_TABLE_NAME
+    else:
+        raise ValueError("Unrecognized table name")
+
+    with _tables_lock:
+        if table_name not in _tables:
+            require_env(*AIRTABLE_VARS)
+            _tables[table_name] = _PooledAirtable(
+                AIRTABLE_BASE_ID,
+                table_name,
+                api_key=AIRTABLE_API_KEY,
+                timeout=AIRTABLE_TIMEOUT,
+            )
+        return _tables[table_name]
 
 
 def save_to_airtable(data, table: str):
@@ -14,32 +142,119 @@ def save_to_airtable(data, table: str):
     Save the provided data to Airtable.
     """
     try:
-        if table == "article":
-            table_name = AIRTABLE_ARTICLE_TABLE_NAME
-        elif table == "content":
-            table_name = AIRTABLE_CONTENT_TABLE_NAME
-        else:
-            raise ValueError("Unrecognized table name")
-        airtable = Airtable(AIRTABLE_BASE_ID, table_name, api_key=AIRTABLE_API_KEY)
+        airtable = _get_table(table)
         record = airtable.insert(data)
+        _cache_set(table, record)
         return record["id"]
     except Exception as e:
         return f"Error saving to Airtable: {str(e)}"
 
 
+def save_many_to_airtable(records, table: str):
+    """
+    Save several records to Airtable using batch inserts of up to 10 records per request.
+    Return the new record IDs in the same order as `records`.
+    """
+    try:
+        airtable = _get_table(table)
+        inserted = airtable.batch_insert(records)
+        for record in inserted:
+            _cache_set(table, record)
+        return [record["id"] for record in inserted]
+    except Exception as e:
+        return f"Error saving to Airtable: {str(e)}"
+
+
+def update_many_in_airtable(updates, table: str):
+    """
+    Update several records in Airtable using batch updates of up to 10 records per request.
+    `updates` is a list of {"id": record_id, "fields": fields_to_update}.
+    """
+    try:
+        airtable = _get_table(table)
+        for update in updates:
+            _cache_invalidate(table, update["id"])
+        airtable.batch_update(updates)
+        return True
+    except Exception as e:
+        return f"Error updating records in Airtable: {str(e)}"
+
+
+class AirtableWriteBuffer:
+    """
+    Write-behind buffer that collects inserts for one table and saves them in batches.
+    Records are flushed once AIRTABLE_BATCH_SIZE are waiting, when `flush` is called, or
+    after `max_delay` seconds, so records queued by concurrent callers share requests.
+    """
+
+    def __init__(self, table: str, max_delay: float = AIRTABLE_WRITE_BUFFER_DELAY):
+        self.table = table
+        self.max_delay = max_delay
+        self._pending = []
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def add(self, fields):
+        """
+        Queue a record for insertion without blocking the caller.
+        Return a Future that resolves to the new record ID (or an error string).
+        """
+        return self.add_many([fields])[0]
+
+    def add_many(self, records):
+        """
+        Queue several records at once. Return a Future per record, as `add` does.
+        Callers that have nothing more to queue should call `flush` rather than
+        wait for the timer.
+        """
+        futures = [Future() for _ in records]
+        with self._lock:
+            self._pending.extend(zip(records, futures))
+            if len(self._pending) >= AIRTABLE_BATCH_SIZE:
+                batch = self._take_pending()
+            else:
+                batch = None
+                if self._timer is None:
+                    self._timer = threading.Timer(self.max_delay, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+        if batch:
+            threading.Thread(target=self._write, args=(batch,), daemon=True).start()
+        return futures
+
+    def flush(self):
+        """
+        Save every queued record now.
+        """
+        with self._lock:
+            batch = self._take_pending()
+        if batch:
+            self._write(batch)
+
+    def _take_pending(self):
+        batch, self._pending = self._pending, []
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return batch
+
+    def _write(self, batch):
+        result = save_many_to_airtable([fields for fields, _ in batch], self.table)
+        for i, (_, future) in enumerate(batch):
+            future.set_result(result if isinstance(result, str) else result[i])
+
+
 def get_from_airtable(record_id, table: str):
     """
-    Retrieve a record from Airtable by its ID.
+    Retrieve a record from Airtable by its ID, using the record cache.
     """
     try:
-        if table == "article":
-            table_name = AIRTABLE_ARTICLE_TABLE_NAME
-        elif table == "content":
-            table_name = AIRTABLE_CONTENT_TABLE_NAME
-        else:
-            raise ValueError("Unrecognized table name")
-        airtable = Airtable(AIRTABLE_BASE_ID, table_name, api_key=AIRTABLE_API_KEY)
+        fields = _cache_get(table, record_id)
+        if fields is not None:
+            return fields
+        airtable = _get_table(table)
         record = airtable.get(record_id)
+        _cache_set(table, record)
         return record["fields"]
     except Exception as e:
         return f"Error retrieving from Airtable: {str(e)}"
@@ -50,13 +265,7 @@ def get_latest_record(table: str):
     Retrieve the latest record from Airtable.
     """
     try:
-        if table == "article":
-            table_name = AIRTABLE_ARTICLE_TABLE_NAME
-        elif table == "content":
-            table_name = AIRTABLE_CONTENT_TABLE_NAME
-        else:
-            raise ValueError("Unrecognized table name")
-        airtable = Airtable(AIRTABLE_BASE_ID, table_name, api_key=AIRTABLE_API_KEY)
+        airtable = _get_table(table)
         records = airtable.get_all(maxRecords=1, sort=[("datetime", "desc")])
         if records:
             return records[0]["fields"]
@@ -66,28 +275,96 @@ def get_latest_record(table: str):
         return f"Error retrieving latest record from Airtable: {str(e)}"
 
 
-def get_content_by_id(content_id):
+def get_all_records(table: str, **options):
+    """
+    Retrieve all records from an Airtable table, e.g. with `fields` or `formula` options.
+    Return a list of record field dicts.
+    """
+    try:
+        airtable = _get_table(table)
+        return [record["fields"] for record in airtable.get_all(**options)]
+    except Exception as e:
+        return f"Error retrieving records from Airtable: {str(e)}"
+
+
+def find_records(table: str, formula: str, **options):
     """
-    Retrieve content from Airtable by its ID.
+    Retrieve the records matching an Airtable formula in as few requests as possible.
+    Return a list of {"id": record_id, "fields": fields} dicts.
     """
     try:
-        airtable = Airtable(
-            AIRTABLE_BASE_ID, AIRTABLE_CONTENT_TABLE_NAME, api_key=AIRTABLE_API_KEY
+        airtable = _get_table(table)
+        return [
+            {"id": record["id"], "fields": record["fields"]}
+            for record in airtable.get_all(formula=formula, **options)
+        ]
+    except Exception as e:
+        return f"Error retrieving records from Airtable: {str(e)}"
+
+
+def get_many_from_airtable(record_ids, table: str):
+    """
+    Retrieve several records by ID, from the record cache or with filtered list
+    queries instead of one request per record. Return a dict of record ID to fields.
+    """
+    records = {}
+    missing = []
+    for record_id in dict.fromkeys(record_ids):
+        fields = _cache_get(table, record_id)
+        if fields is not None:
+            records[record_id] = fields
+        else:
+            missing.append(record_id)
+
+    # keep each formula well under Airtable's URL length limit
+    for i in range(0, len(missing), 50):
+        conditions = ", ".join(
+            f"RECORD_ID()='{record_id}'" for record_id in missing[i : i + 50]
         )
+        found = find_records(table, f"OR({conditions})")
+        if isinstance(found, str):
+            return found
+        for record in found:
+            _cache_set(table, record)
+            records[record["id"]] = record["fields"]
+    return records
+
+
+def get_content_by_id(content_id):
+    """
+    Retrieve content from Airtable by its ID. Content is never cached, so edits
+    made in Airtable are always seen.
+    """
+    try:
+        airtable = _get_table("content")
         record = airtable.get(content_id)
         return record["fields"]
     except Exception as e:
         return f"Error retrieving content from Airtable: {str(e)}"
 
 
+def get_content_with_article(content_id):
+    """
+    Retrieve a content record together with the article it was generated from.
+    The content is always read fresh; the article usually comes from the record
+    cache, so this takes one request. Return (content fields, article fields).
+    """
+    content = get_content_by_id(content_id)
+    if isinstance(content, str):
+        return content
+    article = get_from_airtable(content.get("article_record_id"), "article")
+    if isinstance(article, str):
+        return article
+    return content, article
+
+
 def update_content_status(content_id, status):
     """
     Update the 'posted' status of a content record in Airtable.
     """
     try:
-        airtable = Airtable(
-            AIRTABLE_BASE_ID, AIRTABLE_CONTENT_TABLE_NAME, api_key=AIRTABLE_API_KEY
-        )
+        airtable = _get_table("content")
+        _cache_invalidate("content", content_id)
         airtable.update(content_id, {"posted": status})
         return True
     except Exception as e:
@@ -107,6 +384,14 @@ def lambda_handler(event, context):
             data = body["data"]
             result = save_to_airtable(data, table)
             return {"statusCode": 200, "body": json.dumps({"record_id": result})}
+        elif action == "save_many":
+            records = body["records"]
+            result = save_many_to_airtable(records, table)
+            return {"statusCode": 200, "body": json.dumps({"record_ids": result})}
+        elif action == "update_many":
+            updates = body["updates"]
+            result = update_many_in_airtable(updates, table)
+            return {"statusCode": 200, "body": json.dumps({"success": result})}
         elif action == "get":
             record_id = body["record_id"]
             result = get_from_airtable(record_id, table)
@@ -118,6 +403,10 @@ def lambda_handler(event, context):
             content_id = body["content_id"]
             result = get_content_by_id(content_id)
             return {"statusCode": 200, "body": json.dumps(result)}
+        elif action == "get_content_with_article":
+            content_id = body["content_id"]
+            result = get_content_with_article(content_id)
+            return {"statusCode": 200, "body": json.dumps(result)}
         elif action == "update_status":
             content_id = body["content_id"]
             status = body["status"]
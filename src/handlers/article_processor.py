@@ -1,16 +1,70 @@
+import hashlib
 import json
+from concurrent.futures import ThreadPoolExecutor
 import requests
-from bs4 import BeautifulSoup
-from openai import OpenAI
 
 from ..utils.config import (
     OPENAI_API_KEY,
     ARTICLE_PROCESSOR_MODEL,
     PROCESSOR_INSTRUCTIONS,
+    ARTICLE_TOKEN_BUDGET,
+    ARTICLE_OVERFLOW_STRATEGY,
+    ARTICLE_CHUNK_TOKENS,
+    ARTICLE_CHUNK_CONCURRENCY,
+    ARTICLE_CACHE_PATH,
+    ARTICLE_CACHE_TTL,
+    ARTICLE_CACHE_MAX_ENTRIES,
 )
+from ..utils import metrics
+from ..utils.openai_client import get_openai_client
+from ..utils.disk_cache import DiskCache
+from ..utils.fetcher import fetch_url
+from ..utils.html_extract import extract_text
+from ..utils.tokens import count_tokens, truncate_to_tokens, split_into_chunks
+from ..utils.urls import normalize_url
 
-# Initialize the OpenAI client
-client = OpenAI(api_key=OPENAI_API_KEY)
+# Processed article cache, opened on first use
+_article_cache = None
+
+# Fields of the structured output that are worth caching
+ARTICLE_FIELDS = ("text", "title", "source", "summary")
+
+
+def _get_article_cache():
+    """
+    Return the article cache, opening it on first use.
+    """
+    global _article_cache
+    if _article_cache is None:
+        _article_cache = DiskCache(
+            ARTICLE_CACHE_PATH, ARTICLE_CACHE_TTL, ARTICLE_CACHE_MAX_ENTRIES
+        )
+    return _article_cache
+
+
+def _url_key(url):
+    return f"url:{normalize_url(url)}"
+
+
+def _content_key(raw_content):
+    return f"content:{hashlib.sha256(raw_content.encode('utf-8')).hexdigest()}"
+
+
+def hydrate_article_cache(records):
+    """
+    Seed the article cache from previously saved article records (Airtable fields).
+    Return the number of records added.
+    """
+    cache = _get_article_cache()
+    added = 0
+    for record in records:
+        if not record.get("url") or not record.get("text"):
+            continue
+        key = _url_key(record["url"])
+        if cache.get(key) is None:
+            cache.set(key, {field: record.get(field) for field in ARTICLE_FIELDS})
+            added += 1
+    return added
 
 
 def fetch_raw_article(url):
@@ -18,38 +72,126 @@ def fetch_raw_article(url):
     Fetch and extract the raw content of an article from a given URL.
     """
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, "html.parser")
+        with metrics.span("fetch"):
+            body = fetch_url(url)
 
-        # Extract all raw text from paragraphs. This could be improved with a more measured approach.
-        raw_content = " ".join([p.get_text() for p in soup.find_all("p")])
+        # Extract the main article text, falling back to every paragraph on the page
+        with metrics.span("html_extract"):
+            raw_content = extract_text(body)
         return raw_content
     except requests.RequestException as e:
         return f"Error fetching article: {str(e)}"
 
 
-def process_article(url):
+def _extract(content, request="Please extract the requested information"):
     """
-    Process the article and return structured information using OpenAI.
+    Run the extraction prompt on `content` and return the parsed JSON.
     """
-    content = fetch_raw_article(url)
+    response = get_openai_client().chat.completions.create(
+        model=ARTICLE_PROCESSOR_MODEL,
+        messages=[
+            {"role": "system", "content": PROCESSOR_INSTRUCTIONS},
+            {
+                "role": "user",
+                "content": f"{request} from the following article text:\n\n{content}",
+            },
+        ],
+        response_format={"type": "json_object"},
+    )
+    metrics.record_usage("extract", response.usage)
+    return json.loads(response.choices[0].message.content)
 
-    try:
-        response = client.chat.completions.create(
-            model=ARTICLE_PROCESSOR_MODEL,
-            messages=[
-                {"role": "system", "content": PROCESSOR_INSTRUCTIONS},
-                {
-                    "role": "user",
-                    "content": f"Please extract the requested information from the following article text:\n\n{content}",
-                },
-            ],
-            response_format={"type": "json_object"},
+
+def _extract_in_chunks(content):
+    """
+    Map-reduce extraction for long articles: extract each chunk in parallel,
+    then merge the chunk summaries into a single summary.
+    """
+    chunks = split_into_chunks(content, ARTICLE_CHUNK_TOKENS)
+    print(f"Extracting article in {len(chunks)} chunks")
+
+    def extract_part(index):
+        return _extract(
+            chunks[index],
+            f"This is part {index + 1} of {len(chunks)} of a longer article. "
+            "Please extract the requested information for this part only",
         )
 
-        # Parse the JSON response
-        structured_output = json.loads(response.choices[0].message.content)
+    with ThreadPoolExecutor(
+        max_workers=min(len(chunks), ARTICLE_CHUNK_CONCURRENCY)
+    ) as executor:
+        parts = list(executor.map(extract_part, range(len(chunks))))
+
+    summaries = "\n".join(part.get("summary", "") for part in parts)
+    merged = _extract(
+        summaries,
+        "The following are summaries of consecutive parts of one article. "
+        "Please extract the requested information for the whole article, "
+        "using the combined summaries as the text",
+    )
+
+    def first_found(field):
+        return next((part[field] for part in parts if part.get(field)), None)
+
+    return {
+        "text": " ".join(part.get("text", "") for part in parts),
+        "title": first_found("title") or merged.get("title"),
+        "source": first_found("source") or merged.get("source"),
+        "summary": merged.get("summary"),
+    }
+
+
+def get_cached_article(url):
+    """
+    Return previously processed article data for the URL, or None.
+    """
+    cached = _get_article_cache().get(_url_key(url))
+    metrics.cache_lookup("article_url", cached is not None)
+    if cached is not None:
+        print(f"Article cache hit for {url}")
+        return {**cached, "url": url}
+    return None
+
+
+def extract_article(content, url):
+    """
+    Extract structured information from fetched article text using OpenAI.
+    Results are cached by normalized URL and by a hash of the fetched content.
+    """
+    cache = _get_article_cache()
+    url_key = _url_key(url)
+    fetched = not content.startswith("Error fetching article")
+
+    # the same article can be reachable from different URLs
+    if fetched:
+        content_key = _content_key(content)
+        cached = cache.get(content_key)
+        metrics.cache_lookup("article_content", cached is not None)
+        if cached is not None:
+            print(f"Article content cache hit for {url}")
+            cache.set(url_key, cached)
+            return {**cached, "url": url}
+
+    try:
+        # keep the prompt within budget so latency doesn't grow with article length
+        n_tokens = count_tokens(content)
+        with metrics.span("extract"):
+            if n_tokens <= ARTICLE_TOKEN_BUDGET:
+                structured_output = _extract(content)
+            elif ARTICLE_OVERFLOW_STRATEGY == "map_reduce":
+                structured_output = _extract_in_chunks(content)
+            else:
+                print(
+                    f"Truncating article from {n_tokens} to {ARTICLE_TOKEN_BUDGET} tokens"
+                )
+                structured_output = _extract(
+                    truncate_to_tokens(content, ARTICLE_TOKEN_BUDGET)
+                )
+
+        if fetched:
+            cached = {field: structured_output.get(field) for field in ARTICLE_FIELDS}
+            cache.set(url_key, cached)
+            cache.set(content_key, cached)
 
         # Add the original URL to the output
         structured_output["url"] = url
@@ -59,6 +201,18 @@ def process_article(url):
         return {"error": f"Error processing article: {str(e)}"}
 
 
+def process_article(url):
+    """
+    Process the article and return structured information using OpenAI.
+    """
+    cached = get_cached_article(url)
+    if cached is not None:
+        return cached
+
+    content = fetch_raw_article(url)
+    return extract_article(content, url)
+
+
 def lambda_handler(event, context):
     """
     AWS Lambda handler function.
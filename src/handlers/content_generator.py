@@ -1,16 +1,115 @@
 import json
-from openai import OpenAI
+import os
+import threading
+import time
+import uuid
+from functools import lru_cache
 
 from ..utils.config import (
     OPENAI_API_KEY,
     CONTENT_GENERATOR_MODEL,
     CONTENT_ASSISTANT_CONFIGS,
+    ASSISTANT_REGISTRY_PATH,
+    CONTENT_TOKEN_BUDGET,
+    ASSISTANT_RUN_MODE,
+    RUN_POLL_INITIAL_INTERVAL,
+    RUN_POLL_MAX_INTERVAL,
+    RUN_TIMEOUT,
+    THREAD_STORE_PATH,
+    THREAD_STORE_TTL,
+    THREAD_STORE_MAX_ENTRIES,
+    SHORTEN_CANDIDATES,
 )
+from ..utils import metrics
+from ..utils.disk_cache import DiskCache
+from ..utils.openai_client import get_openai_client
+from ..utils.tokens import truncate_to_tokens
+from ..utils.text_length import MAX_TWEET_LENGTH, fits_tweet, weighted_length
 
-from typing import Optional
+from typing import Callable, Optional
 
-# Initialize the OpenAI client
-client = OpenAI(api_key=OPENAI_API_KEY)
+# Assistant registry: assistant name ("{platform}-{version}") -> assistant id.
+# Kept in memory and mirrored to ASSISTANT_REGISTRY_PATH so restarts skip the lookup.
+# Because the name includes the config version, bumping a version is a cache miss.
+_assistant_registry = None
+_registry_lock = threading.Lock()
+
+# Conversations generated by the "chat" engine, keyed by thread ID, opened on
+# first use. Their IDs start with LOCAL_THREAD_PREFIX; OpenAI's start with "thread_".
+LOCAL_THREAD_PREFIX = "chat_"
+_thread_store = None
+_thread_store_lock = threading.Lock()
+
+
+def _get_thread_store():
+    """
+    Return the local thread store, opening it on first use.
+    """
+    global _thread_store
+    with _thread_store_lock:
+        if _thread_store is None:
+            _thread_store = DiskCache(
+                THREAD_STORE_PATH, THREAD_STORE_TTL, THREAD_STORE_MAX_ENTRIES
+            )
+        return _thread_store
+
+
+def _engine(platform: str):
+    """
+    Return the generation engine configured for the platform.
+    """
+    return CONTENT_ASSISTANT_CONFIGS.get(platform).get("engine", "assistants")
+
+
+def _assistant_name(platform: str):
+    """
+    Return the assistant name for the platform's current config version.
+    """
+    platform_config = CONTENT_ASSISTANT_CONFIGS.get(platform)
+    return f'{platform}-{platform_config.get("version")}'
+
+
+def _load_registry():
+    """
+    Load the assistant registry from disk, dropping entries for stale config versions.
+    """
+    current_names = {
+        _assistant_name(platform) for platform in CONTENT_ASSISTANT_CONFIGS
+    }
+    try:
+        with open(ASSISTANT_REGISTRY_PATH, "r") as file:
+            registry = json.load(file)
+    except (OSError, ValueError):
+        registry = {}
+    return {
+        name: asst_id for name, asst_id in registry.items() if name in current_names
+    }
+
+
+def _save_registry():
+    """
+    Write the assistant registry to disk.
+    """
+    try:
+        os.makedirs(os.path.dirname(ASSISTANT_REGISTRY_PATH) or ".", exist_ok=True)
+        tmp_path = f"{ASSISTANT_REGISTRY_PATH}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(_assistant_registry, file, indent=2)
+        os.replace(tmp_path, ASSISTANT_REGISTRY_PATH)
+    except OSError as e:
+        print(f"Could not save assistant registry: {str(e)}")
+
+
+def warm_assistant_registry():
+    """
+    Resolve the assistant for every platform using the assistants engine, e.g.
+    once at bot startup. Return a dict of platform to assistant id.
+    """
+    return {
+        platform: _load_or_create_assistant(platform)
+        for platform in CONTENT_ASSISTANT_CONFIGS
+        if _engine(platform) == "assistants"
+    }
 
 
 def _load_or_create_assistant(platform: str):
@@ -19,59 +118,292 @@ def _load_or_create_assistant(platform: str):
     Use the config for the relevant platform.
     Return the assistant id.
     """
+    global _assistant_registry
+
     platform_config = CONTENT_ASSISTANT_CONFIGS.get(platform)
-    assistant_name = f'{platform}-{platform_config.get("version")}'
+    assistant_name = _assistant_name(platform)
+
+    # fast path: no network calls once the registry is warm
+    if _assistant_registry and assistant_name in _assistant_registry:
+        return _assistant_registry[assistant_name]
 
     try:
-        for asst in client.beta.assistants.list():
-            if assistant_name == asst.name:
-                # assistant found
-                print(f"assistant {assistant_name} found")
-                return asst.id
-
-        print(f"assistant {assistant_name} not found, attempting to create")
-        asst = client.beta.assistants.create(
-            model=CONTENT_GENERATOR_MODEL,
-            instructions=platform_config.get("instructions"),
-            name=assistant_name,
-            temperature=platform_config.get("temperature"),
-            top_p=platform_config.get("top_p"),
-        )
-        print(f"assistant {assistant_name} created")
-        return asst.id
+        # hold the lock while looking up or creating so concurrent calls
+        # don't create duplicate assistants
+        with _registry_lock:
+            if _assistant_registry is None:
+                _assistant_registry = _load_registry()
+                # drop stale versions from the file as well
+                _save_registry()
+            if assistant_name in _assistant_registry:
+                return _assistant_registry[assistant_name]
+
+            assistant_id = _find_or_create_assistant(assistant_name, platform_config)
+            _assistant_registry[assistant_name] = assistant_id
+            _save_registry()
+            return assistant_id
     except Exception as e:
         return f"Error getting or creating assistant: {str(e)}"
 
 
-def generate_content(article_text: str, platform: str):
+def _find_or_create_assistant(assistant_name: str, platform_config: dict):
+    """
+    Look up an assistant by name through the API, creating it if it doesn't exist.
+    Return the assistant id.
+    """
+    client = get_openai_client()
+    for asst in client.beta.assistants.list():
+        if assistant_name == asst.name:
+            # assistant found
+            print(f"assistant {assistant_name} found")
+            return asst.id
+
+    print(f"assistant {assistant_name} not found, attempting to create")
+    asst = client.beta.assistants.create(
+        model=CONTENT_GENERATOR_MODEL,
+        instructions=platform_config.get("instructions"),
+        name=assistant_name,
+        temperature=platform_config.get("temperature"),
+        top_p=platform_config.get("top_p"),
+    )
+    print(f"assistant {assistant_name} created")
+    return asst.id
+
+
+# Run states after which a run will not change any more
+TERMINAL_RUN_STATUSES = {"completed", "failed", "cancelled", "expired", "incomplete"}
+
+
+@lru_cache(maxsize=None)
+def _text_stream_handler_class():
+    """
+    Return the stream event handler class. The OpenAI SDK is imported on first use
+    to keep it out of cold starts that never stream a run.
+    """
+    from openai import AssistantEventHandler
+
+    class TextStreamHandler(AssistantEventHandler):
+        """
+        Event handler that passes the message text generated so far to a callback.
+        """
+
+        def __init__(self, on_text: Optional[Callable[[str], None]] = None):
+            super().__init__()
+            self.on_text = on_text
+
+        def on_text_delta(self, delta, snapshot):
+            if self.on_text:
+                self.on_text(snapshot.value)
+
+    return TextStreamHandler
+
+
+def _local_thread(thread_id: str):
+    """
+    Return the stored conversation for a chat engine thread.
+    """
+    thread = _get_thread_store().get(thread_id)
+    if thread is None:
+        raise ValueError(f"Thread {thread_id} not found in the local thread store")
+    return thread
+
+
+def _latest_message_text(thread_id: str):
+    """
+    Return the text of the most recent message on the thread.
+    """
+    if thread_id.startswith(LOCAL_THREAD_PREFIX):
+        return _local_thread(thread_id)["messages"][-1]["content"]
+    content_response = get_openai_client().beta.threads.messages.list(
+        thread_id, limit=1, order="desc"
+    )
+    return content_response.data[0].content[0].text.value
+
+
+def _add_message(thread_id: str, content: str, role: str):
+    """
+    Add a message to the thread, e.g. shortened content, so later runs build on it.
+    """
+    if thread_id.startswith(LOCAL_THREAD_PREFIX):
+        thread = _local_thread(thread_id)
+        thread["messages"].append({"role": role, "content": content})
+        _get_thread_store().set(thread_id, thread)
+    else:
+        get_openai_client().beta.threads.messages.create(
+            thread_id, content=content, role=role
+        )
+
+
+def _chat_completion(
+    platform: str,
+    messages: list,
+    on_text: Optional[Callable[[str], None]] = None,
+):
+    """
+    Complete the conversation with the platform's instructions in a single
+    request and return the reply. Streams the reply when `on_text` is given,
+    passing it the text generated so far.
+    """
+    platform_config = CONTENT_ASSISTANT_CONFIGS.get(platform)
+    request = dict(
+        model=CONTENT_GENERATOR_MODEL,
+        messages=[
+            {"role": "system", "content": platform_config.get("instructions")},
+            *messages,
+        ],
+        temperature=platform_config.get("temperature"),
+        top_p=platform_config.get("top_p"),
+    )
+    client = get_openai_client()
+    if on_text is None:
+        response = client.chat.completions.create(**request)
+        metrics.record_usage("generate", response.usage)
+        return response.choices[0].message.content
+
+    text = ""
+    stream = client.chat.completions.create(
+        **request, stream=True, stream_options={"include_usage": True}
+    )
+    for chunk in stream:
+        if chunk.usage:
+            metrics.record_usage("generate", chunk.usage)
+        if chunk.choices and chunk.choices[0].delta.content:
+            text += chunk.choices[0].delta.content
+            on_text(text)
+    return text
+
+
+def _generate_with_chat(
+    platform: str,
+    prompt: str,
+    on_text: Optional[Callable[[str], None]] = None,
+):
+    """
+    Generate content with one chat completion and keep the conversation in the
+    local thread store. Return the text and the new thread ID.
+    """
+    messages = [{"role": "user", "content": prompt}]
+    with metrics.span("chat_completion", platform=platform):
+        text = _chat_completion(platform, messages, on_text=on_text)
+    thread_id = f"{LOCAL_THREAD_PREFIX}{uuid.uuid4().hex}"
+    _get_thread_store().set(
+        thread_id,
+        {
+            "platform": platform,
+            "messages": [*messages, {"role": "assistant", "content": text}],
+        },
+    )
+    return text, thread_id
+
+
+def _wait_for_run(thread_id: str, run_id: str):
+    """
+    Poll a run until it finishes, starting with short intervals and backing off.
+    """
+    client = get_openai_client()
+    interval = RUN_POLL_INITIAL_INTERVAL
+    deadline = time.monotonic() + RUN_TIMEOUT
+    while True:
+        run = client.beta.threads.runs.retrieve(run_id, thread_id=thread_id)
+        if run.status in TERMINAL_RUN_STATUSES:
+            return run
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Run {run_id} did not finish in {RUN_TIMEOUT}s")
+        time.sleep(interval)
+        interval = min(interval * 2, RUN_POLL_MAX_INTERVAL)
+
+
+def _run_assistant(
+    thread_id: str,
+    assistant_id: str,
+    on_text: Optional[Callable[[str], None]] = None,
+):
+    """
+    Run the assistant on the thread and return the generated message text.
+    Streams the run when ASSISTANT_RUN_MODE is "stream", passing partial text to
+    `on_text`, and falls back to adaptive polling if streaming isn't available.
+    """
+    client = get_openai_client()
+    run = None
+    if ASSISTANT_RUN_MODE == "stream":
+        handler = _text_stream_handler_class()(on_text)
+        try:
+            with client.beta.threads.runs.stream(
+                thread_id=thread_id, assistant_id=assistant_id, event_handler=handler
+            ) as stream:
+                stream.until_done()
+            run = stream.get_final_run()
+        except Exception as e:
+            print(f"Streaming run failed, falling back to polling: {str(e)}")
+            # don't start a second run if the stream already started one
+            run = handler.current_run
+
+    if run is None:
+        run = client.beta.threads.runs.create(
+            thread_id=thread_id, assistant_id=assistant_id
+        )
+    if run.status not in TERMINAL_RUN_STATUSES:
+        run = _wait_for_run(thread_id, run.id)
+    if run.status != "completed":
+        raise RuntimeError(f"Run {run.id} ended with status {run.status}")
+    metrics.record_usage("generate", run.usage)
+
+    return _latest_message_text(thread_id)
+
+
+def generate_content(
+    article_text: str,
+    platform: str,
+    on_text: Optional[Callable[[str], None]] = None,
+    max_n_char: Optional[int] = None,
+):
     """
     Generate social media content based on the article text and platform.
+    If given, `on_text` is called with the partial content as it is generated,
+    and the model is asked to stay within `max_n_char` characters.
+    Uses the platform's engine: an assistant run on an OpenAI thread, or a single
+    chat completion whose conversation is kept in the local thread store.
     """
     try:
         # check platform
         if platform not in CONTENT_ASSISTANT_CONFIGS:
             raise ValueError(f"Unsupported platform: {platform}")
 
+        # keep the prompt within budget for long articles
+        article_text = truncate_to_tokens(article_text, CONTENT_TOKEN_BUDGET)
+
+        # ask for the length limit up front so overflows are rare
+        length_request = (
+            f" The content must be at most {max_n_char} characters long."
+            if max_n_char
+            else ""
+        )
+        prompt = f"Please generate social media content from the following article.{length_request}\n\n{article_text}"
+
+        if _engine(platform) == "chat":
+            text, thread_id = _generate_with_chat(platform, prompt, on_text=on_text)
+            return {
+                "text": text,
+                "thread_id": thread_id,
+            }
+
         # get assistant
         assistant_id = _load_or_create_assistant(platform)
 
         # setup thread
+        client = get_openai_client()
         thread_id = client.beta.threads.create().id
         message = client.beta.threads.messages.create(
             thread_id,
-            content=f"Please generate social media content from the following article.\n\n{article_text}",
+            content=prompt,
             role="user",
         )
 
         # get result
-        run_result = client.beta.threads.runs.create_and_poll(
-            thread_id=thread_id, assistant_id=assistant_id, poll_interval_ms=2000
-        )
-        content_response = client.beta.threads.messages.list(
-            thread_id, limit=1, order="desc"
-        )
+        with metrics.span("assistant_run", platform=platform):
+            text = _run_assistant(thread_id, assistant_id, on_text=on_text)
         return {
-            "text": content_response.data[0].content[0].text.value,
+            "text": text,
             "thread_id": thread_id,
         }
 
@@ -79,54 +411,86 @@ def generate_content(article_text: str, platform: str):
         return f"Error generating content: {str(e)}"
 
 
+def _shortened_candidates(
+    content: str, platform: str, max_n_char: int, n_candidates: int
+):
+    """
+    Ask for `n_candidates` shortened versions of `content` in a single call.
+    """
+    metrics.inc("shorten_rounds_total", platform=platform)
+    platform_config = CONTENT_ASSISTANT_CONFIGS.get(platform)
+    n_char = weighted_length(content)
+    over_by = n_char - max_n_char
+    response = get_openai_client().chat.completions.create(
+        model=CONTENT_GENERATOR_MODEL,
+        messages=[
+            {"role": "system", "content": platform_config.get("instructions")},
+            {
+                "role": "user",
+                "content": (
+                    f"The following {platform} post is {n_char} characters long, "
+                    f"{over_by} over the limit of {max_n_char}. Rewrite it to at most "
+                    f"{max_n_char} characters, keeping as much of the original content "
+                    "and intent as possible. Reply with the rewritten post only."
+                    f"\n\n{content}"
+                ),
+            },
+        ],
+        n=n_candidates,
+        temperature=platform_config.get("temperature"),
+        top_p=platform_config.get("top_p"),
+    )
+    metrics.record_usage("shorten", response.usage)
+    return [choice.message.content.strip() for choice in response.choices]
+
+
 def shorten_content(
-    thread_id: str, platform: str, max_n_char: int = 280, max_tries: int = 5
+    thread_id: str,
+    platform: str,
+    max_n_char: int = MAX_TWEET_LENGTH,
+    n_candidates: int = SHORTEN_CANDIDATES,
 ):
     """
-    Shorten the content on the given thread and return the new content.
+    Shorten the content on the given thread (an OpenAI thread, or a local one
+    from the chat engine) and return the new content.
+    Length is measured the way X counts it (see utils.text_length). Several
+    candidates are generated in one call and the longest one that fits is kept;
+    only if none fit is the closest candidate rewritten once more.
+    The chosen content is added to the thread so later runs build on it.
     """
     try:
         # check platform
         if platform not in CONTENT_ASSISTANT_CONFIGS:
             raise ValueError(f"Unsupported platform: {platform}")
 
-        # retrieve assistant, content
-        assistant_id = _load_or_create_assistant(platform)
-        content = (
-            client.beta.threads.messages.list(thread_id, limit=1, order="desc")
-            .data[0]
-            .content[0]
-            .text.value
-        )
+        # retrieve content
+        content = _latest_message_text(thread_id)
+        if fits_tweet(content, max_n_char):
+            return content
 
-        # shorten content
-        tries = 0
-        while len(content) > max_n_char and tries < max_tries:
-            print(f"Shortening content, try {tries}.")
-            print(f"Current character count: {len(content)}")
-            tries += 1
-            message = client.beta.threads.messages.create(
-                thread_id,
-                content=f"Please shorten the content generated in the previous message, while keeping as much of the original content and intent as possible.",
-                role="user",
-            )
-            run_result = client.beta.threads.runs.create_and_poll(
-                thread_id=thread_id, assistant_id=assistant_id, poll_interval_ms=2000
-            )
+        print(f"Shortening content from {weighted_length(content)} characters.")
+        candidates = _shortened_candidates(content, platform, max_n_char, n_candidates)
+        fitting = [c for c in candidates if fits_tweet(c, max_n_char)]
 
-            # update content
-            content_response = client.beta.threads.messages.list(
-                thread_id, limit=1, order="desc"
+        # targeted rewrite of the closest candidate if none fit
+        if not fitting:
+            closest = min(candidates, key=weighted_length)
+            print(
+                f"No candidate fit, rewriting closest ({weighted_length(closest)} characters)."
             )
-            content = content_response.data[0].content[0].text.value
-            print(f"Shortened character count: {len(content)}")
-
-        # return error after max tries
-        if len(content) > max_n_char:
-            raise ValueError(
-                f"Failed shorten content to {max_n_char} characters in {max_tries} tries."
+            candidates = _shortened_candidates(
+                closest, platform, max_n_char, n_candidates
             )
+            fitting = [c for c in candidates if fits_tweet(c, max_n_char)]
+
+        # return error if nothing fits
+        if not fitting:
+            metrics.inc("shorten_failures_total", platform=platform)
+            raise ValueError(f"Failed shorten content to {max_n_char} characters.")
 
+        content = max(fitting, key=weighted_length)
+        print(f"Shortened character count: {weighted_length(content)}")
+        _add_message(thread_id, content, "assistant")
         return content
 
     except Exception as e:
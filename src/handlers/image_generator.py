@@ -1,29 +1,49 @@
+import base64
 import json
-from openai import OpenAI
 
 from ..utils.config import (
     OPENAI_API_KEY,
     IMAGE_GENERATOR_MODEL,
     IMAGE_INSTRUCTIONS,
+    OPENAI_IMAGE_TIMEOUT,
 )
+from ..utils.openai_client import get_openai_client
+from ..utils import image_store, metrics
 
-# Initialize the OpenAI client
-client = OpenAI(api_key=OPENAI_API_KEY)
+IMAGE_SIZE = "1024x1024"
+IMAGE_QUALITY = "standard"
 
 
 def generate_image(article_summary):
     """
     Generate an image based on the given article summary using DALL-E.
+    The image is saved in the image store and its key is returned; a summary
+    that was already illustrated returns the stored image without a request.
     """
     try:
-        response = client.images.generate(
-            model=IMAGE_GENERATOR_MODEL,
-            prompt=f"{IMAGE_INSTRUCTIONS}\n\n{article_summary}",
-            size="1024x1024",
-            quality="standard",
-            n=1,
+        prompt = f"{IMAGE_INSTRUCTIONS}\n\n{article_summary}"
+        prompt_key = image_store.prompt_key(
+            IMAGE_GENERATOR_MODEL, IMAGE_SIZE, IMAGE_QUALITY, prompt
         )
-        return response.data[0].url
+        key = image_store.get_for_prompt(prompt_key)
+        metrics.cache_lookup("image_prompt", bool(key))
+        if key:
+            return key
+
+        with metrics.span("image"):
+            # return the image itself, since the URL alternative expires
+            response = get_openai_client().images.generate(
+                model=IMAGE_GENERATOR_MODEL,
+                prompt=prompt,
+                size=IMAGE_SIZE,
+                quality=IMAGE_QUALITY,
+                response_format="b64_json",
+                n=1,
+                timeout=OPENAI_IMAGE_TIMEOUT,
+            )
+            key = image_store.put(base64.b64decode(response.data[0].b64_json))
+        image_store.set_for_prompt(prompt_key, key)
+        return key
     except Exception as e:
         return f"Error generating image: {str(e)}"
 
@@ -31,13 +51,19 @@ def generate_image(article_summary):
 def lambda_handler(event, context):
     """
     AWS Lambda handler function.
+    Returns the image store key as `image_url` and the image itself, base64-encoded,
+    as `image_b64`, since the store under /tmp doesn't outlive the container.
     """
     try:
         body = json.loads(event["body"])
         article_summary = body["article_summary"]
 
         image_url = generate_image(article_summary)
-        return {"statusCode": 200, "body": json.dumps({"image_url": image_url})}
+        result = {"image_url": image_url}
+        if image_store.is_key(image_url):
+            image = image_store.get(image_url)
+            result["image_b64"] = base64.b64encode(image).decode("ascii")
+        return {"statusCode": 200, "body": json.dumps(result)}
     except Exception as e:
         return {"statusCode": 400, "body": json.dumps({"error": str(e)})}
 
@@ -1,7 +1,9 @@
+import io
 import json
-import os
+import threading
+import time
+from urllib.parse import urlsplit
 from dotenv import load_dotenv
-import tweepy
 import requests
 
 from ..utils.config import (
@@ -10,53 +12,186 @@ from ..utils.config import (
     TWITTER_ACCESS_TOKEN,
     TWITTER_ACCESS_TOKEN_SECRET,
     TWITTER_BEARER_TOKEN,
+    TWITTER_MAX_IMAGE_BYTES,
+    TWITTER_MAX_IMAGE_SIDE,
+    TWITTER_POSTS_PER_MINUTE,
+    TWITTER_VARS,
+    require_env,
 )
+from ..utils import image_store, metrics
+from ..utils.images import download_image, fit_image
+from ..utils.rate_limit import RateLimiter
+from ..utils.text_length import MAX_TWEET_LENGTH, fits_tweet, weighted_length
 
 # Load environment variables if running as a standalone script
 if __name__ == "__main__":
     load_dotenv()
 
 
-def post_to_twitter(content, image_url=None):
+class _KeepAliveSession(requests.Session):
     """
-    Post content to Twitter with an optional image using Twitter API v2.
+    Session that stays open, since tweepy.API closes its session after every request.
     """
-    try:
-        # Authenticate with Twitter API v2
-        client = tweepy.Client(
+
+    def close(self):
+        pass
+
+
+class TwitterPoster:
+    """
+    Process-wide X poster holding authenticated sessions that are reused across
+    posts. Posts are spaced by TWITTER_POSTS_PER_MINUTE and, when X's rate-limit
+    headers report an endpoint's quota as used up, held back locally until it resets.
+    """
+
+    def __init__(self):
+        require_env(*TWITTER_VARS)
+        # tweepy is only imported once something is posted
+        import tweepy
+
+        self.client = tweepy.Client(
             bearer_token=TWITTER_BEARER_TOKEN,
             consumer_key=TWITTER_API_KEY,
             consumer_secret=TWITTER_API_SECRET,
             access_token=TWITTER_ACCESS_TOKEN,
             access_token_secret=TWITTER_ACCESS_TOKEN_SECRET,
+            wait_on_rate_limit=True,
         )
+        self.client.session.hooks["response"].append(self._record_rate_limit)
+        self._api = None
+        self._api_lock = threading.Lock()
+        self._limiter = RateLimiter(TWITTER_POSTS_PER_MINUTE, 60)
+        # endpoint -> {"limit", "remaining", "reset"} from the latest response
+        self.rate_limits = {}
+
+    @property
+    def api(self):
+        """
+        v1.1 API, only needed for media upload, created on first use.
+        """
+        with self._api_lock:
+            if self._api is None:
+                import tweepy
+
+                auth = tweepy.OAuth1UserHandler(
+                    TWITTER_API_KEY,
+                    TWITTER_API_SECRET,
+                    TWITTER_ACCESS_TOKEN,
+                    TWITTER_ACCESS_TOKEN_SECRET,
+                )
+                api = tweepy.API(auth, wait_on_rate_limit=True)
+                api.session = _KeepAliveSession()
+                api.session.hooks["response"].append(self._record_rate_limit)
+                self._api = api
+            return self._api
+
+    def _record_rate_limit(self, response, *args, **kwargs):
+        """
+        requests response hook that records the request's duration and the
+        endpoint's rate-limit headers.
+        """
+        endpoint = f"{response.request.method} {urlsplit(response.url).path}"
+        metrics.observe(
+            "span_duration_seconds",
+            response.elapsed.total_seconds(),
+            span="x",
+            endpoint=endpoint,
+        )
+        metrics.inc("x_responses_total", endpoint=endpoint, status=response.status_code)
+        headers = response.headers
+        if "x-rate-limit-remaining" not in headers:
+            return
+        limit = {
+            "limit": int(headers.get("x-rate-limit-limit", 0)),
+            "remaining": int(headers["x-rate-limit-remaining"]),
+            "reset": int(headers.get("x-rate-limit-reset", 0)),
+        }
+        self.rate_limits[endpoint] = limit
+        metrics.set_gauge(
+            "x_rate_limit_remaining", limit["remaining"], endpoint=endpoint
+        )
+        metrics.set_gauge("x_rate_limit_limit", limit["limit"], endpoint=endpoint)
+        if limit["remaining"] == 0:
+            wait = limit["reset"] - time.time()
+            print(f"X rate limit for {endpoint} used up, holding posts for {wait:.0f}s")
+            self._limiter.pause(wait)
+
+    def upload_image(self, image: bytes, extension: str):
+        """
+        Upload image bytes and return the media ID.
+        """
+        media = self.api.media_upload(
+            filename=f"image.{extension}", file=io.BytesIO(image)
+        )
+        return media.media_id
+
+    def post(self, content, media_ids=None):
+        """
+        Post a tweet, waiting for the local rate limit first. Return the tweet ID.
+        """
+        metrics.observe("rate_limit_wait_seconds", self._limiter.acquire(), service="x")
+        tweet = self.client.create_tweet(text=content, media_ids=media_ids)
+        return tweet.data["id"]
+
 
-        # If there's an image, upload it to Twitter
-        media_ids = None
-        if image_url:
-            # For media upload, we still need to use v1.1 API
-            auth = tweepy.OAuthHandler(TWITTER_API_KEY, TWITTER_API_SECRET)
-            auth.set_access_token(TWITTER_ACCESS_TOKEN, TWITTER_ACCESS_TOKEN_SECRET)
-            api = tweepy.API(auth)
-
-            response = requests.get(image_url)
-            if response.status_code == 200:
-                # Save the image temporarily
-                with open("temp_image.jpg", "wb") as f:
-                    f.write(response.content)
-                # Upload the image to Twitter
-                media = api.media_upload("temp_image.jpg")
-                media_ids = [media.media_id]
-                # Remove the temporary image file
-                os.remove("temp_image.jpg")
-
-        # Post the tweet
-        if media_ids:
-            tweet = client.create_tweet(text=content, media_ids=media_ids)
+_poster = None
+_poster_lock = threading.Lock()
+
+
+def get_twitter_poster():
+    """
+    Return the process-wide TwitterPoster, creating it on first use.
+    """
+    global _poster
+    with _poster_lock:
+        if _poster is None:
+            _poster = TwitterPoster()
+        return _poster
+
+
+def _load_image(image_url):
+    """
+    Return (image bytes, extension) ready to upload to X for a URL or image store
+    key, or None if it can't be loaded.
+    """
+    try:
+        if image_store.is_key(image_url):
+            image = image_store.get(image_url)
         else:
-            tweet = client.create_tweet(text=content)
+            image = download_image(image_url)
+        return fit_image(image, TWITTER_MAX_IMAGE_BYTES, TWITTER_MAX_IMAGE_SIDE)
+    except (requests.RequestException, ValueError, OSError) as e:
+        # post without the image when it is missing, too large to download, or
+        # not an image at all (e.g. an HTML error page; PIL raises an OSError)
+        print(f"Could not load image {image_url}: {str(e)}")
+        return None
+
+
+def post_to_twitter(content, image_url=None):
+    """
+    Post content to Twitter with an optional image using Twitter API v2.
+    `image_url` is either a URL or an image store key.
+    """
+    try:
+        # Reject content X would refuse before making any requests
+        if not fits_tweet(content):
+            raise ValueError(
+                f"Content is {weighted_length(content)} characters,"
+                f" over the {MAX_TWEET_LENGTH} limit"
+            )
+
+        poster = get_twitter_poster()
+
+        with metrics.span("post", platform="X"):
+            # If there's an image, upload it to Twitter
+            media_ids = None
+            image = _load_image(image_url) if image_url else None
+            if image:
+                # Keep the image in memory so concurrent posts don't share a file
+                media_ids = [poster.upload_image(*image)]
 
-        return f"Posted to Twitter: {tweet.data['id']}"
+            tweet_id = poster.post(content, media_ids)
+        return f"Posted to Twitter: {tweet_id}"
     except Exception as e:
         return f"Error posting to Twitter: {str(e)}"
 
@@ -1,3 +1,7 @@
+import asyncio
+import functools
+import io
+
 import discord
 from discord.ext import commands
 
@@ -8,98 +12,409 @@ from .handlers import (
     airtable_manager,
     social_media_poster,
 )
-from .utils.config import DISCORD_TOKEN, CHANNEL_ID
+from .pipeline import PLATFORMS, _check, generate_platform_content, run_article
+from .scheduler import post_approved_content, seconds_until_next_run
+from .utils.config import (
+    DISCORD_TOKEN,
+    CHANNEL_ID,
+    ARTICLE_CACHE_HYDRATE,
+    POSTING_APPROVAL_FORMULA,
+    PIPELINE_MODE,
+    JOB_POLL_INTERVAL,
+    BULK_CONCURRENCY,
+    POSTS_PER_RUN,
+    DISCORD_VARS,
+    OPENAI_VARS,
+    AIRTABLE_VARS,
+    require_env,
+)
+from .utils import image_store, metrics
+from .utils.executor import run_blocking, run_stage_graph, shutdown_executor
+from .utils.discord_messages import (
+    MAX_EMBED_TITLE_LENGTH,
+    MAX_MESSAGE_LENGTH,
+    LiveMessage,
+    ProgressMessage,
+)
+from .utils.job_queue import DONE, FAILED, get_job_queue
+from .utils.openai_client import openai_breaker
+from .utils.urls import extract_urls, dedupe_urls
 
 from typing import Optional
 
+
+class ArticleBot(commands.Bot):
+    """
+    Bot that also shuts down the shared handler pool when it closes.
+    """
+
+    async def close(self):
+        await super().close()
+        # let handler calls that are still running finish, then stop the pool
+        await asyncio.to_thread(shutdown_executor)
+
+
 intents = discord.Intents.default()
 intents.message_content = True
-bot = commands.Bot(command_prefix="!", intents=intents)
+bot = ArticleBot(command_prefix="!", intents=intents)
+
+# keep references to in-flight article jobs so they are not garbage collected
+_article_tasks = set()
+
+# content records from concurrent articles are written to Airtable in batches
+_content_writes = airtable_manager.AirtableWriteBuffer("content")
+
+# scheduled posting runs in the background; the lock keeps runs from overlapping
+_posting_task = None
+_posting_lock = asyncio.Lock()
+
+# on_ready fires again after reconnects; startup work only runs the first time
+_started = False
 
 
 @bot.event
 async def on_ready():
     print(f"{bot.user} has connected to Discord!")
 
+    global _started, _posting_task
+    if _started:
+        return
+    _started = True
+
+    # resolve content assistants once so generation doesn't have to look them up
+    assistants = await run_blocking(content_generator.warm_assistant_registry)
+    print(f"Content assistants ready: {assistants}")
+
+    # seed the article cache with articles that were already processed
+    if ARTICLE_CACHE_HYDRATE:
+        records = await run_blocking(
+            airtable_manager.get_all_records,
+            "article",
+            fields=["url", *article_processor.ARTICLE_FIELDS],
+        )
+        if isinstance(records, str):
+            print(records)
+        else:
+            added = await run_blocking(article_processor.hydrate_article_cache, records)
+            print(f"Article cache hydrated with {added} records")
+
+    if seconds_until_next_run() is not None:
+        if POSTING_APPROVAL_FORMULA.strip():
+            _posting_task = asyncio.create_task(run_posting_schedule())
+        else:
+            print("Posting schedule disabled: POSTING_APPROVAL_FORMULA is not set")
+
 
 @bot.event
 async def on_message(message):
     if message.author == bot.user:
         return
 
-    if message.channel.id == int(CHANNEL_ID):
+    # commands like !bulk handle their own URLs
+    is_command = message.content.startswith(bot.command_prefix)
+    if message.channel.id == int(CHANNEL_ID) and not is_command:
         # Check if the message contains a URL
-        urls = [word for word in message.content.split() if word.startswith("http")]
+        urls = extract_urls(message.content)
         if urls:
             url = urls[0]  # Take the first URL found
-            await process_article(message.channel, url)
+            # run in the background so the bot stays responsive to other messages
+            handler = process_article if PIPELINE_MODE == "inline" else enqueue_article
+            task = asyncio.create_task(handler(message.channel, url))
+            _article_tasks.add(task)
+            task.add_done_callback(_article_tasks.discard)
 
     await bot.process_commands(message)
 
 
+async def _summary_embed(url, article_data, contents, image_url, content_record_ids):
+    """
+    Build the final summary embed for a processed article.
+    Return the embed and, for images in the image store, the file it shows.
+    """
+    title = article_data.get("title") or url
+    embed = discord.Embed(title=title[:MAX_EMBED_TITLE_LENGTH], url=url)
+    for platform, content in contents.items():
+        embed.add_field(
+            name=f"{platform} content", value=content.get("text")[:1024], inline=False
+        )
+    for platform, record_id in content_record_ids.items():
+        embed.add_field(name=f"{platform} content record", value=record_id)
+    image_file = None
+    if image_store.is_key(image_url):
+        try:
+            image = await run_blocking(image_store.get, image_url)
+        except FileNotFoundError:
+            # e.g. generated by a worker on another host; show the summary without it
+            print(f"Image {image_url} is not in this host's image store")
+        else:
+            image_file = discord.File(io.BytesIO(image), filename="image.png")
+            embed.set_image(url="attachment://image.png")
+    elif image_url and image_url.startswith("http"):
+        embed.set_image(url=image_url)
+    if "X" in content_record_ids:
+        embed.set_footer(
+            text=f"Ready to post with: !post_twitter {content_record_ids['X']}"
+        )
+    return embed, image_file
+
+
+@metrics.traced("article")
 async def process_article(channel, url):
-    await channel.send("Processing article from above URL.")
+    progress = ProgressMessage(channel, f"Processing article: {url}")
+
+    # don't start new work while OpenAI is failing
+    while openai_breaker.is_open():
+        wait = openai_breaker.retry_after()
+        progress.set("OpenAI", f"failing, waiting {wait:.0f}s")
+        await asyncio.sleep(wait)
+    if "OpenAI" in progress.steps:
+        progress.set("OpenAI", "available")
 
     # 1. Fetch and process the article
-    article_data = article_processor.process_article(url)
+    progress.set("Article", "processing...")
+    article_data = await run_blocking(article_processor.process_article, url)
     if "error" in article_data:
-        await channel.send(f"Error processing article: {article_data['error']}")
+        progress.set("Article", "failed")
+        await progress.finish(
+            detail=f"Error processing article: {article_data['error']}"
+        )
         return
+    progress.set("Article", "processed")
+
+    # 2-4. Save the article, generate per-platform content and the image
+    # concurrently, then join them before saving the content records
+    platforms = PLATFORMS
+
+    async def save_article():
+        with metrics.span("save"):
+            record_id = await run_blocking(
+                airtable_manager.save_to_airtable, article_data, "article"
+            )
+        progress.set("Airtable article record", record_id)
+        # fail the article rather than save content pointing at an error string
+        return _check(record_id)
+
+    async def generate_content(platform):
+        # show the content as it is generated
+        progress.set(f"{platform} content", "generating...")
+        content = await run_blocking(
+            generate_platform_content,
+            article_data,
+            platform,
+            on_text=progress.set_detail_threadsafe,
+        )
+        progress.set(f"{platform} content", "generated")
+        return content
+
+    async def generate_image():
+        progress.set("Image", "generating...")
+        image_url = await run_blocking(
+            image_generator.generate_image, article_data.get("summary", "")
+        )
+        failed = image_url.startswith("Error")
+        progress.set("Image", "failed" if failed else "generated")
+        return _check(image_url)
+
+    # 6. Save social media content to airtable
+    async def save_content(airtable_article_record_id, image_url, *contents):
+        futures = _content_writes.add_many(
+            [
+                {
+                    "article_record_id": airtable_article_record_id,
+                    "platform": platform,
+                    "content": content.get("text"),
+                    "thread_id": content.get("thread_id"),
+                    "image_url": image_url,
+                    "posted": "N",
+                }
+                for platform, content in zip(platforms, contents)
+            ]
+        )
+        content_record_ids = {}
+        with metrics.span("persist"):
+            # nothing more is coming from this article, so write now; records
+            # other articles queued meanwhile go out in the same batch
+            await run_blocking(_content_writes.flush)
+            for platform, future in zip(platforms, futures):
+                content_record_ids[platform] = _check(await asyncio.wrap_future(future))
+                progress.set(
+                    f"Airtable {platform} content record", content_record_ids[platform]
+                )
+        return content_record_ids
 
-    await channel.send("Article processed.")
+    stages = {
+        "article": (save_article, []),
+        "image": (generate_image, []),
+        "content": (save_content, ["article", "image", *platforms]),
+    }
+    for platform in platforms:
+        stages[platform] = (functools.partial(generate_content, platform), [])
+    try:
+        results = await run_stage_graph(stages)
+    except Exception as e:
+        await progress.finish(detail=f"Error processing article: {str(e)}")
+        return
 
-    # 2. Save article data to Airtable
-    airtable_article_record_id = airtable_manager.save_to_airtable(
-        article_data, "article"
+    # 7. Inform user that content is ready for review
+    embed, image_file = await _summary_embed(
+        url,
+        article_data,
+        {platform: results[platform] for platform in platforms},
+        results["image"],
+        results["content"],
     )
-    await channel.send(
-        f"Article data saved to Airtable. Article Record ID: {airtable_article_record_id}"
+    await progress.finish(embed=embed, file=image_file)
+
+
+async def enqueue_article(channel, url):
+    """
+    Queue the article for the worker processes and report the job's progress.
+    """
+    queue = get_job_queue()
+    job_id = await run_blocking(queue.enqueue, url)
+    progress = ProgressMessage(channel, f"Article job {job_id}: {url}")
+    progress.set("Status", "queued")
+
+    last_stage = None
+    while True:
+        await asyncio.sleep(JOB_POLL_INTERVAL)
+        job = await run_blocking(queue.get, job_id)
+        if job["stage"] != last_stage:
+            last_stage = job["stage"]
+            progress.set(last_stage, "finished")
+        progress.set("Status", job["status"])
+
+        if job["status"] == FAILED:
+            await progress.finish(detail=f"Error processing article: {job['error']}")
+            return
+        if job["status"] == DONE:
+            break
+
+    state = job["state"]
+    embed, image_file = await _summary_embed(
+        url,
+        state["article_data"],
+        state["contents"],
+        state["image_url"],
+        state["content_record_ids"],
     )
+    await progress.finish(embed=embed, file=image_file)
 
-    # 3. Generate social media content
-    platforms = ["X"]
-    generated_content = {}
-    for platform in platforms:
-        content = content_generator.generate_content(
-            article_data.get("text", ""), platform
-        )
 
-        # if a tweet is too long, regenerate
-        max_tweet_n_char = 280 - 23
-        if platform == "X" and len(content.get("text")) > max_tweet_n_char:
-            await channel.send("Shortening tweet.")
-            content["text"] = content_generator.shorten_content(
-                content.get("thread_id"), platform, max_n_char=max_tweet_n_char
-            )
+@bot.command(name="bulk")
+async def bulk(ctx, *, urls_text: str = ""):
+    """
+    Process many articles at once, from URLs in the message and in attached text files.
+    Usage: !bulk <url> <url> ... (or attach a .txt file with one URL per line)
+    """
+    text = urls_text
+    for attachment in ctx.message.attachments:
+        text += "\n" + (await attachment.read()).decode("utf-8", errors="ignore")
 
-        generated_content[platform] = content
-        await channel.send(f"Generated content for {platform}:\n{content.get('text')}")
+    urls = dedupe_urls(extract_urls(text))
+    if not urls:
+        await ctx.send("No URLs found. Usage: `!bulk <url> <url> ...`")
+        return
 
-    # 4. Generate image
-    image_url = image_generator.generate_image(article_data.get("summary", ""))
-    await channel.send(f"Generated image: {image_url}")
+    progress = LiveMessage(ctx.channel)
+    progress.update(f"Bulk processing {len(urls)} articles: queued.")
+    results = {}
 
-    # 6. Save social media content to airtable
-    for platform, content in generated_content.items():
-        airtable_content_record_id = airtable_manager.save_to_airtable(
-            {
-                "article_record_id": airtable_article_record_id,
-                "platform": platform,
-                "content": content.get("text"),
-                "thread_id": content.get("thread_id"),
-                "image_url": image_url,
-                "posted": "N",
-            },
-            "content",
-        )
-        await channel.send(
-            f"Content saved to Airtable.  Content Record ID: {airtable_content_record_id}"
+    def summary():
+        failed = sum(isinstance(result, str) for result in results.values())
+        return (
+            f"Bulk processing {len(urls)} articles: "
+            f"{len(results) - failed} done, {failed} failed."
         )
 
-    # 7. Inform user that content is ready for review
-    await channel.send(
-        f"Content generated and ready to post.\nYou can post to twitter with the command `!post_twitter {airtable_content_record_id}`"
+    def report(url, result):
+        results[url] = result
+        progress.update(summary())
+
+    if PIPELINE_MODE == "inline":
+        semaphore = asyncio.Semaphore(BULK_CONCURRENCY)
+
+        async def process(url):
+            async with semaphore:
+                try:
+                    state = await run_blocking(run_article, url)
+                    report(url, state["content_record_ids"])
+                except Exception as e:
+                    report(url, f"Error: {str(e)}")
+
+        await asyncio.gather(*(process(url) for url in urls))
+    else:
+        queue = get_job_queue()
+        jobs = {await run_blocking(queue.enqueue, url): url for url in urls}
+        while len(results) < len(jobs):
+            await asyncio.sleep(JOB_POLL_INTERVAL)
+            for job_id, url in jobs.items():
+                if url in results:
+                    continue
+                job = await run_blocking(queue.get, job_id)
+                if job["status"] == DONE:
+                    report(url, job["state"]["content_record_ids"])
+                elif job["status"] == FAILED:
+                    report(url, f"Error: {job['error']}")
+
+    # one line per URL would not fit in a message, so attach them as a file
+    lines = []
+    for url in urls:
+        result = results[url]
+        if isinstance(result, str):
+            lines.append(f"{url}: {result}")
+        else:
+            record_ids = ", ".join(
+                f"{platform} {record_id}" for platform, record_id in result.items()
+            )
+            lines.append(f"{url}: {record_ids}")
+    report_file = discord.File(
+        io.BytesIO("\n".join(lines).encode("utf-8")), filename="bulk_results.txt"
     )
+    await progress.finish(summary(), file=report_file)
+
+
+async def post_approved(channel, limit: int = POSTS_PER_RUN):
+    """
+    Post approved content records and report the results in the channel.
+    """
+    async with _posting_lock:
+        try:
+            results = await run_blocking(post_approved_content, limit)
+        except Exception as e:
+            await channel.send(f"Error posting approved content: {str(e)}")
+            return
+    if not results:
+        await channel.send("No approved content waiting to be posted.")
+        return
+    lines = [f"Tried to post {len(results)} approved content records:"]
+    lines += [f"{record_id}: {result}" for record_id, result in results]
+    await channel.send("\n".join(lines)[:MAX_MESSAGE_LENGTH])
+
+
+async def run_posting_schedule():
+    """
+    Post approved content at the configured interval or time slots.
+    """
+    while True:
+        await asyncio.sleep(seconds_until_next_run())
+        try:
+            channel = bot.get_channel(int(CHANNEL_ID)) or await bot.fetch_channel(
+                int(CHANNEL_ID)
+            )
+            await post_approved(channel)
+        except Exception as e:
+            # one failed run must not stop the schedule; the next run tries again
+            print(f"Error in scheduled posting: {str(e)}")
+
+
+@bot.command(name="post_approved")
+async def post_approved_command(ctx, limit: int = POSTS_PER_RUN):
+    """
+    Post approved, unposted content records now instead of waiting for the schedule.
+    Usage: !post_approved [limit]
+    """
+    await post_approved(ctx.channel, limit)
 
 
 @bot.command(name="post_twitter")
@@ -109,20 +424,19 @@ async def post_twitter(ctx, content_id: str):
     Usage: !post_twitter <content_id>
     """
 
-    # Fetch content from Airtable
-    content_data = airtable_manager.get_content_by_id(content_id)
-    article_data = airtable_manager.get_from_airtable(
-        content_data.get("article_record_id"), "article"
-    )
-    article_url = article_data.get("url")
-
-    if not content_data:
-        await ctx.send(f"Content with ID {content_id} not found in Airtable.")
+    # Fetch content from Airtable and its article (usually from the record cache)
+    result = await run_blocking(airtable_manager.get_content_with_article, content_id)
+    if isinstance(result, str):
+        await ctx.send(f"Content with ID {content_id} not found in Airtable: {result}")
         return
+    content_data, article_data = result
+    article_url = article_data.get("url")
 
     # Post to Twitter
-    result = social_media_poster.post_to_twitter(
-        content_data["content"] + "\n" + article_url, content_data.get("image_url")
+    result = await run_blocking(
+        social_media_poster.post_to_twitter,
+        content_data["content"] + "\n" + article_url,
+        content_data.get("image_url"),
     )
 
     if "Error" in result:
@@ -131,7 +445,9 @@ async def post_twitter(ctx, content_id: str):
         await ctx.send(f"Successfully posted to Twitter: {result}")
 
         # Update Airtable to mark content as posted
-        update_result = airtable_manager.update_content_status(content_id, "Y")
+        update_result = await run_blocking(
+            airtable_manager.update_content_status, content_id, "Y"
+        )
         await ctx.send(f"Airtable record {content_id} updated as posted.")
 
 
@@ -145,4 +461,6 @@ async def regenerate_content(ctx, content_id: str, user_message: Optional[str] =
 
 
 if __name__ == "__main__":
+    require_env(*DISCORD_VARS, *OPENAI_VARS, *AIRTABLE_VARS)
+    metrics.start_metrics_server()
     bot.run(DISCORD_TOKEN)
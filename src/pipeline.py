@@ -0,0 +1,204 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .handlers import (
+    article_processor,
+    content_generator,
+    image_generator,
+    airtable_manager,
+)
+from .utils import metrics
+from .utils.config import BULK_CONCURRENCY
+from .utils.job_queue import STAGES
+from .utils.openai_client import openai_breaker
+from .utils.text_length import MAX_TWEET_LENGTH, weighted_length
+
+# Platforms content is generated for
+PLATFORMS = ["X"]
+
+
+class PipelineError(Exception):
+    """
+    Raised when a pipeline stage fails.
+    """
+
+
+def _check(result, prefix="Error"):
+    """
+    Raise PipelineError if a handler returned one of its error strings.
+    """
+    if isinstance(result, str) and result.startswith(prefix):
+        raise PipelineError(result)
+    return result
+
+
+def max_content_length(platform: str, url: str):
+    """
+    Return the length limit for generated content, or None if there isn't one.
+    """
+    if platform == "X":
+        # tweets also carry a newline and the article URL
+        return MAX_TWEET_LENGTH - weighted_length(f"\n{url}")
+    return None
+
+
+def generate_platform_content(article_data: dict, platform: str, on_text=None):
+    """
+    Generate content for one platform, shortening it if it is over the limit.
+    """
+    max_n_char = max_content_length(platform, article_data.get("url", ""))
+    with metrics.span("generate", platform=platform):
+        content = _check(
+            content_generator.generate_content(
+                article_data.get("text", ""),
+                platform,
+                on_text=on_text,
+                max_n_char=max_n_char,
+            )
+        )
+
+    if max_n_char and weighted_length(content.get("text")) > max_n_char:
+        with metrics.span("shorten", platform=platform):
+            content["text"] = _check(
+                content_generator.shorten_content(
+                    content.get("thread_id"), platform, max_n_char=max_n_char
+                )
+            )
+    return content
+
+
+# Pipeline stages, run by the job queue workers and by bulk processing.
+# Each one updates the job state in place; `checkpoint` saves progress made
+# within a stage.
+
+
+def fetch_stage(state, checkpoint):
+    cached = article_processor.get_cached_article(state["url"])
+    if cached is not None:
+        state["article_data"] = cached
+    else:
+        state["raw_content"] = _check(
+            article_processor.fetch_raw_article(state["url"]), "Error fetching article"
+        )
+
+
+def extract_stage(state, checkpoint):
+    if "article_data" not in state:
+        article_data = article_processor.extract_article(
+            state["raw_content"], state["url"]
+        )
+        if "error" in article_data:
+            raise PipelineError(article_data["error"])
+        state["article_data"] = article_data
+    state.pop("raw_content", None)
+
+
+def _generate_image(state):
+    return _check(
+        image_generator.generate_image(state["article_data"].get("summary", ""))
+    )
+
+
+def generate_stage(state, checkpoint):
+    # the image is generated alongside the content, as in the bot's inline
+    # pipeline; each result is checkpointed as it arrives so a resumed job only
+    # redoes what is missing
+    contents = state.setdefault("contents", {})
+    tasks = {
+        platform: (generate_platform_content, state["article_data"], platform)
+        for platform in PLATFORMS
+        if platform not in contents
+    }
+    if "image_url" not in state:
+        tasks["image"] = (_generate_image, state)
+    if not tasks:
+        return
+
+    errors = []
+    with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+        futures = {executor.submit(*task): name for name, task in tasks.items()}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                errors.append(e)
+                continue
+            if name == "image":
+                state["image_url"] = result
+            else:
+                contents[name] = result
+            checkpoint()
+    if errors:
+        raise errors[0]
+
+
+def image_stage(state, checkpoint):
+    # only jobs checkpointed before the image moved into the generate stage
+    if "image_url" not in state:
+        state["image_url"] = _generate_image(state)
+
+
+def persist_stage(state, checkpoint):
+    if "article_record_id" not in state:
+        with metrics.span("save"):
+            state["article_record_id"] = _check(
+                airtable_manager.save_to_airtable(state["article_data"], "article")
+            )
+        # don't save the article twice if the job is resumed
+        checkpoint()
+
+    platforms = list(state["contents"])
+    with metrics.span("persist"):
+        record_ids = _check(
+            airtable_manager.save_many_to_airtable(
+                [
+                    {
+                        "article_record_id": state["article_record_id"],
+                        "platform": platform,
+                        "content": state["contents"][platform].get("text"),
+                        "thread_id": state["contents"][platform].get("thread_id"),
+                        "image_url": state["image_url"],
+                        "posted": "N",
+                    }
+                    for platform in platforms
+                ],
+                "content",
+            )
+        )
+    state["content_record_ids"] = dict(zip(platforms, record_ids))
+
+
+STAGE_FUNCTIONS = {
+    "fetch": fetch_stage,
+    "extract": extract_stage,
+    "generate": generate_stage,
+    "image": image_stage,
+    "persist": persist_stage,
+}
+
+
+@metrics.traced("article")
+def run_article(url: str):
+    """
+    Run every stage for one article in the calling thread and return the final state.
+    Waits first if OpenAI has been failing, rather than starting work that would fail.
+    """
+    openai_breaker.wait()
+    state = {"url": url}
+    for stage in STAGES:
+        STAGE_FUNCTIONS[stage](state, lambda: None)
+    return state
+
+
+def run_articles(urls, concurrency: int = BULK_CONCURRENCY):
+    """
+    Process several articles with bounded concurrency.
+    Yield (url, final state or the exception it failed with) as each one finishes.
+    """
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = {executor.submit(run_article, url): url for url in urls}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result()
+            except Exception as e:
+                yield futures[future], e
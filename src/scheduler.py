@@ -0,0 +1,92 @@
+import datetime
+
+from .handlers import airtable_manager, social_media_poster
+from .utils.config import (
+    POSTING_APPROVAL_FORMULA,
+    POSTING_INTERVAL,
+    POSTING_TIME_SLOTS,
+    POSTS_PER_RUN,
+)
+
+
+def approved_content_formula(platform: str = "X"):
+    """
+    Return the Airtable formula matching content records that are ready to post.
+    Raises ValueError if no approval condition is configured, so unreviewed
+    content is never posted.
+    """
+    if not POSTING_APPROVAL_FORMULA.strip():
+        raise ValueError(
+            "POSTING_APPROVAL_FORMULA is not set, refusing to post unreviewed content"
+        )
+    conditions = [
+        "{posted}='N'",
+        f"{{platform}}='{platform}'",
+        POSTING_APPROVAL_FORMULA,
+    ]
+    return f"AND({', '.join(conditions)})"
+
+
+def post_approved_content(limit: int = POSTS_PER_RUN):
+    """
+    Post up to `limit` approved, unposted X content records and mark them posted.
+    Records and their articles are read with one filtered query each, and each
+    record is marked posted as soon as its post succeeds, so a run that is
+    interrupted doesn't post it again. Return a list of
+    (content record ID, post result) tuples.
+    """
+    records = airtable_manager.find_records(
+        "content", approved_content_formula("X"), maxRecords=limit
+    )
+    if isinstance(records, str):
+        raise RuntimeError(records)
+    if not records:
+        return []
+
+    articles = airtable_manager.get_many_from_airtable(
+        [record["fields"].get("article_record_id") for record in records], "article"
+    )
+    if isinstance(articles, str):
+        raise RuntimeError(articles)
+
+    results = []
+    for record in records:
+        fields = record["fields"]
+        article = articles.get(fields.get("article_record_id"))
+        if article is None:
+            results.append((record["id"], "Error: article record not found"))
+            continue
+        # posts are paced by the shared X poster's rate limiter
+        result = social_media_poster.post_to_twitter(
+            fields["content"] + "\n" + article.get("url", ""),
+            fields.get("image_url"),
+        )
+        results.append((record["id"], result))
+        if not result.startswith("Error"):
+            update = airtable_manager.update_content_status(record["id"], "Y")
+            if isinstance(update, str):
+                # stop rather than risk posting more records that can't be marked
+                raise RuntimeError(
+                    f"Posted {record['id']} but could not mark it posted: {update}"
+                )
+    return results
+
+
+def seconds_until_next_run(now: datetime.datetime = None):
+    """
+    Return the seconds until the next scheduled posting run, or None if posting
+    isn't scheduled. Time slots take precedence over the interval.
+    """
+    now = now or datetime.datetime.now()
+    if POSTING_TIME_SLOTS:
+        runs = []
+        for slot in POSTING_TIME_SLOTS:
+            hour, minute = (int(part) for part in slot.split(":"))
+            run = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+            if run <= now:
+                run += datetime.timedelta(days=1)
+            runs.append(run)
+        return (min(runs) - now).total_seconds()
+    if POSTING_INTERVAL > 0:
+        return POSTING_INTERVAL * 60
+    return None
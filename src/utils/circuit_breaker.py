@@ -0,0 +1,55 @@
+import threading
+import time
+
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit breaker. After `failure_threshold` consecutive failures
+    it opens for `reset_timeout` seconds; after that one more failure reopens it
+    and a success closes it.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                if self._opened_at is None or self._remaining() == 0:
+                    print(f"Circuit opened after {self._failures} failures")
+                self._opened_at = time.monotonic()
+
+    def _remaining(self):
+        if self._opened_at is None:
+            return 0.0
+        return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def retry_after(self):
+        """
+        Return the seconds until new work may be tried again, 0 if it may now.
+        """
+        with self._lock:
+            return self._remaining()
+
+    def is_open(self):
+        return self.retry_after() > 0
+
+    def wait(self):
+        """
+        Block until the breaker lets new work through.
+        """
+        while True:
+            remaining = self.retry_after()
+            if remaining <= 0:
+                return
+            time.sleep(remaining)
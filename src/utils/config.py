@@ -1,3 +1,4 @@
+import datetime
 import os
 
 # Load environment variables from .env file only if not in a cloud environment
@@ -9,6 +10,59 @@ if os.getenv("ENV") != "cloud":
 # Discord configuration
 DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
 CHANNEL_ID = os.getenv("CHANNEL_ID")
+# minimum seconds between edits of a message that is updated in place
+DISCORD_EDIT_INTERVAL = float(os.getenv("DISCORD_EDIT_INTERVAL", "1.0"))
+
+# Worker pool configuration
+# number of threads used to run blocking handler calls off the Discord event loop
+WORKER_POOL_SIZE = int(os.getenv("WORKER_POOL_SIZE", "8"))
+
+# number of articles processed at once by !bulk and run_bulk.py
+BULK_CONCURRENCY = int(os.getenv("BULK_CONCURRENCY", "4"))
+
+# Job queue configuration
+# "inline" processes articles inside the bot; "queue" hands them to worker
+# processes (run_worker.py) through a durable job queue
+PIPELINE_MODE = os.getenv("PIPELINE_MODE", "inline")
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", os.path.join(".data", "jobs.sqlite3"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# a job whose worker hasn't checked in for this long is picked up by another worker
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "600"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# seconds between queue polls by idle workers and by the bot reporting progress
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "2"))
+
+# Local cache configuration
+# directory for small on-disk caches that should survive restarts
+CACHE_DIR = os.getenv("CACHE_DIR", ".cache")
+ASSISTANT_REGISTRY_PATH = os.path.join(CACHE_DIR, "assistant_registry.json")
+# processed articles, keyed by normalized URL and by a hash of the fetched content
+ARTICLE_CACHE_PATH = os.path.join(CACHE_DIR, "article_cache.sqlite3")
+ARTICLE_CACHE_TTL = int(os.getenv("ARTICLE_CACHE_TTL", str(7 * 24 * 60 * 60)))
+ARTICLE_CACHE_MAX_ENTRIES = int(os.getenv("ARTICLE_CACHE_MAX_ENTRIES", "5000"))
+# load previously processed articles from Airtable into the cache at bot startup
+ARTICLE_CACHE_HYDRATE = os.getenv("ARTICLE_CACHE_HYDRATE", "false").lower() == "true"
+# fetched pages and their ETag/Last-Modified validators, for conditional GETs;
+# bodies are stored compressed and larger ones aren't cached, which bounds the
+# cache at roughly HTTP_CACHE_MAX_ENTRIES * HTTP_CACHE_MAX_BODY_BYTES
+HTTP_CACHE_PATH = os.path.join(CACHE_DIR, "http_cache.sqlite3")
+HTTP_CACHE_TTL = int(os.getenv("HTTP_CACHE_TTL", str(7 * 24 * 60 * 60)))
+HTTP_CACHE_MAX_ENTRIES = int(os.getenv("HTTP_CACHE_MAX_ENTRIES", "200"))
+HTTP_CACHE_MAX_BODY_BYTES = int(
+    os.getenv("HTTP_CACHE_MAX_BODY_BYTES", str(1024 * 1024))
+)
+
+# Article fetch configuration
+FETCH_CONNECT_TIMEOUT = float(os.getenv("FETCH_CONNECT_TIMEOUT", "5"))
+FETCH_READ_TIMEOUT = float(os.getenv("FETCH_READ_TIMEOUT", "15"))
+# upper bound on the whole download, so slow servers can't hold a worker forever
+FETCH_TOTAL_TIMEOUT = float(os.getenv("FETCH_TOTAL_TIMEOUT", "30"))
+# bodies larger than this are truncated
+FETCH_MAX_BYTES = int(os.getenv("FETCH_MAX_BYTES", str(5 * 1024 * 1024)))
+# keep-alive sessions are kept for this many hosts; the least recently used is closed
+FETCH_MAX_SESSIONS = 64
+# "main_content" (lxml + readability-style heuristic) or "paragraphs" (every <p>)
+ARTICLE_EXTRACTOR = os.getenv("ARTICLE_EXTRACTOR", "main_content")
 
 # OpenAI configuration
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
@@ -16,11 +70,88 @@ ARTICLE_PROCESSOR_MODEL = "gpt-4o-mini"
 CONTENT_GENERATOR_MODEL = "gpt-4o"
 IMAGE_GENERATOR_MODEL = "dall-e-3"
 
+# OpenAI client configuration
+# seconds to wait for a connection, and for each response (or stream chunk)
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5"))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+# image generation is slower, so it gets its own timeout
+OPENAI_IMAGE_TIMEOUT = float(os.getenv("OPENAI_IMAGE_TIMEOUT", "120"))
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "20"))
+# 429 and 5xx responses are retried with jittered exponential backoff
+# (base * 2^attempt seconds, capped), or after the retry-after the API sends
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "4"))
+OPENAI_BACKOFF_BASE = 0.5
+OPENAI_BACKOFF_MAX = 30.0
+# after this many requests in a row fail even with retries, new articles wait
+# OPENAI_BREAKER_RESET seconds before starting
+OPENAI_BREAKER_THRESHOLD = int(os.getenv("OPENAI_BREAKER_THRESHOLD", "5"))
+OPENAI_BREAKER_RESET = float(os.getenv("OPENAI_BREAKER_RESET", "60"))
+# generated images are kept here, content-addressed, since OpenAI's URLs expire;
+# can be a shared or S3-mounted directory so the bot and workers see the same images.
+# On Lambda only /tmp is writable and it is lost with the container, so the default
+# there is /tmp/images and the image_generator handler also returns the image bytes
+IMAGE_STORE_DIR = os.path.abspath(
+    os.getenv(
+        "IMAGE_STORE_DIR",
+        (
+            os.path.join("/tmp", "images")
+            if os.getenv("AWS_LAMBDA_FUNCTION_NAME")
+            else os.path.join(".data", "images")
+        ),
+    )
+)
+
+# Assistant run configuration
+# "stream" returns as soon as a run completes and reports partial text;
+# "poll" polls the run with an adaptive backoff
+ASSISTANT_RUN_MODE = os.getenv("ASSISTANT_RUN_MODE", "stream")
+# first and maximum poll intervals (seconds) for polled runs
+RUN_POLL_INITIAL_INTERVAL = 0.25
+RUN_POLL_MAX_INTERVAL = 2.0
+# how long polled runs may take before giving up (seconds)
+RUN_TIMEOUT = float(os.getenv("RUN_TIMEOUT", "300"))
+
+# Content generation engines
+# each platform's "engine" in CONTENT_ASSISTANT_CONFIGS is "assistants" (an
+# assistant run on an OpenAI thread) or "chat" (one chat completion, with the
+# conversation kept in a local thread store for shortening and regeneration)
+THREAD_STORE_PATH = os.path.join(CACHE_DIR, "threads.sqlite3")
+THREAD_STORE_TTL = int(os.getenv("THREAD_STORE_TTL", str(30 * 24 * 60 * 60)))
+THREAD_STORE_MAX_ENTRIES = int(os.getenv("THREAD_STORE_MAX_ENTRIES", "10000"))
+
+# Length-constrained generation
+# number of shortened candidates requested in a single call when content is too long
+SHORTEN_CANDIDATES = int(os.getenv("SHORTEN_CANDIDATES", "4"))
+
+# Prompt size configuration
+# articles over ARTICLE_TOKEN_BUDGET are either truncated ("truncate") or
+# extracted in parallel chunks of ARTICLE_CHUNK_TOKENS and merged ("map_reduce")
+ARTICLE_TOKEN_BUDGET = int(os.getenv("ARTICLE_TOKEN_BUDGET", "12000"))
+ARTICLE_OVERFLOW_STRATEGY = os.getenv("ARTICLE_OVERFLOW_STRATEGY", "map_reduce")
+ARTICLE_CHUNK_TOKENS = int(os.getenv("ARTICLE_CHUNK_TOKENS", "4000"))
+ARTICLE_CHUNK_CONCURRENCY = int(os.getenv("ARTICLE_CHUNK_CONCURRENCY", "4"))
+# article text sent to the content assistants is truncated to this many tokens
+CONTENT_TOKEN_BUDGET = int(os.getenv("CONTENT_TOKEN_BUDGET", "12000"))
+
 # Airtable configuration
 AIRTABLE_API_KEY = os.getenv("AIRTABLE_API_KEY")
 AIRTABLE_BASE_ID = os.getenv("AIRTABLE_BASE_ID")
 AIRTABLE_ARTICLE_TABLE_NAME = "Articles"
 AIRTABLE_CONTENT_TABLE_NAME = "Post Content"
+# Airtable allows 5 requests per second per base
+AIRTABLE_REQUESTS_PER_SECOND = float(os.getenv("AIRTABLE_REQUESTS_PER_SECOND", "5"))
+# (connect, read) timeout in seconds for Airtable requests
+AIRTABLE_TIMEOUT = (5, 30)
+AIRTABLE_MAX_RETRIES = 3
+# Airtable's batch endpoints accept up to 10 records per request
+AIRTABLE_BATCH_SIZE = 10
+# seconds buffered writes may wait for more records before being flushed
+AIRTABLE_WRITE_BUFFER_DELAY = float(os.getenv("AIRTABLE_WRITE_BUFFER_DELAY", "1.0"))
+# article records read or written by this process are kept in memory for this
+# many seconds, so repeated lookups (e.g. !post_twitter) skip the round-trip;
+# content records are always read fresh since reviewers edit them in Airtable
+AIRTABLE_RECORD_CACHE_TTL = float(os.getenv("AIRTABLE_RECORD_CACHE_TTL", "300"))
+AIRTABLE_RECORD_CACHE_MAX_ENTRIES = 1000
 
 # X (Twitter) configuration
 TWITTER_API_KEY = os.getenv("TWITTER_API_KEY")
@@ -28,24 +159,68 @@ TWITTER_API_SECRET = os.getenv("TWITTER_API_SECRET")
 TWITTER_ACCESS_TOKEN = os.getenv("TWITTER_ACCESS_TOKEN")
 TWITTER_ACCESS_TOKEN_SECRET = os.getenv("TWITTER_ACCESS_TOKEN_SECRET")
 TWITTER_BEARER_TOKEN = os.getenv("TWITTER_BEARER_TOKEN")
+# images over these limits are downscaled and re-encoded before upload
+TWITTER_MAX_IMAGE_BYTES = int(
+    os.getenv("TWITTER_MAX_IMAGE_BYTES", str(5 * 1024 * 1024))
+)
+TWITTER_MAX_IMAGE_SIDE = int(os.getenv("TWITTER_MAX_IMAGE_SIDE", "4096"))
+# Posting scheduler configuration
+# Airtable formula content records must match to be posted by the schedule or
+# !post_approved, e.g. "{approved}=1"; records also need posted='N'. Nothing is
+# posted automatically until this is set
+POSTING_APPROVAL_FORMULA = os.getenv("POSTING_APPROVAL_FORMULA", "")
+# post approved records every POSTING_INTERVAL minutes (0 disables it), or at
+# comma-separated local times like "09:00,13:00,17:30"
+POSTING_INTERVAL = float(os.getenv("POSTING_INTERVAL", "0"))
+POSTING_TIME_SLOTS = [
+    slot.strip()
+    for slot in os.getenv("POSTING_TIME_SLOTS", "").split(",")
+    if slot.strip()
+]
+for _slot in POSTING_TIME_SLOTS:
+    try:
+        datetime.datetime.strptime(_slot, "%H:%M")
+    except ValueError:
+        raise ValueError(
+            f"Invalid POSTING_TIME_SLOTS entry {_slot!r}, expected a time like 09:00"
+        ) from None
+# most records posted per scheduled run
+POSTS_PER_RUN = int(os.getenv("POSTS_PER_RUN", "5"))
+# posts are spaced to at most this many per minute; X's own rate-limit headers
+# hold them back further when a quota runs out
+TWITTER_POSTS_PER_MINUTE = float(os.getenv("TWITTER_POSTS_PER_MINUTE", "10"))
+
+# Metrics configuration
+# stage and external call timings, token usage, cache hits and rate-limit
+# headroom are served at http://METRICS_HOST:METRICS_PORT/metrics (0 disables
+# it); worker processes use the ports after METRICS_PORT
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+# also export spans with OpenTelemetry over OTLP (needs opentelemetry-sdk and
+# opentelemetry-exporter-otlp; configured with the standard OTEL_* variables)
+METRICS_OTEL = os.getenv("METRICS_OTEL", "false").lower() == "true"
 
-# Validate required environment variables
-required_vars = [
-    "DISCORD_TOKEN",
-    "CHANNEL_ID",
-    "OPENAI_API_KEY",
-    "AIRTABLE_API_KEY",
-    "AIRTABLE_BASE_ID",
+# Environment variables each service needs. They are checked with require_env
+# when a client is first built, so e.g. the image Lambda doesn't need X keys.
+DISCORD_VARS = ("DISCORD_TOKEN", "CHANNEL_ID")
+OPENAI_VARS = ("OPENAI_API_KEY",)
+AIRTABLE_VARS = ("AIRTABLE_API_KEY", "AIRTABLE_BASE_ID")
+TWITTER_VARS = (
     "TWITTER_API_KEY",
     "TWITTER_API_SECRET",
     "TWITTER_ACCESS_TOKEN",
     "TWITTER_ACCESS_TOKEN_SECRET",
     "TWITTER_BEARER_TOKEN",
-]
+)
+
 
-for var in required_vars:
-    if not globals()[var]:
-        raise EnvironmentError(f"{var} is not set in the environment variables.")
+def require_env(*names):
+    """Raise EnvironmentError if any of the given variables is not set."""
+    missing = [name for name in names if not globals()[name]]
+    if missing:
+        raise EnvironmentError(
+            f"{', '.join(missing)} not set in the environment variables."
+        )
 
 
 def get_instructions(filename):
@@ -56,19 +231,34 @@ def get_instructions(filename):
         return file.read()
 
 
-# Load instructions
-PROCESSOR_INSTRUCTIONS = get_instructions("processor_instructions.txt")
-IMAGE_INSTRUCTIONS = get_instructions("image_instructions.txt")
-
-# load content assistant configs
-# if a platform's instructions, gen params, or model are updated,
-# the corresponding version number must be increased
-# otherwise the previous assistant will be loaded
-CONTENT_ASSISTANT_CONFIGS = {
-    "X": {
-        "version": 1,
-        "instructions": get_instructions("content_instructions_x.txt"),
-        "temperature": 1,
-        "top_p": 1,
-    },
+def _content_assistant_configs():
+    # load content assistant configs
+    # if a platform's instructions, gen params, or model are updated,
+    # the corresponding version number must be increased
+    # otherwise the previous assistant will be loaded
+    # the engine can be switched without a version bump
+    return {
+        "X": {
+            "version": 1,
+            "engine": os.getenv("CONTENT_ENGINE_X", "assistants"),
+            "instructions": get_instructions("content_instructions_x.txt"),
+            "temperature": 1,
+            "top_p": 1,
+        },
+    }
+
+
+# Instructions are loaded on first access, so modules only read the files they use
+_LAZY_SETTINGS = {
+    "PROCESSOR_INSTRUCTIONS": lambda: get_instructions("processor_instructions.txt"),
+    "IMAGE_INSTRUCTIONS": lambda: get_instructions("image_instructions.txt"),
+    "CONTENT_ASSISTANT_CONFIGS": _content_assistant_configs,
 }
+
+
+def __getattr__(name):
+    if name not in _LAZY_SETTINGS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = _LAZY_SETTINGS[name]()
+    globals()[name] = value
+    return value
@@ -0,0 +1,122 @@
+import asyncio
+import time
+
+from .config import DISCORD_EDIT_INTERVAL
+
+# Discord rejects messages and embed titles longer than these
+MAX_MESSAGE_LENGTH = 2000
+MAX_EMBED_TITLE_LENGTH = 256
+
+
+class LiveMessage:
+    """
+    A Discord message that is sent once and then edited in place.
+    Updates are debounced: at most one edit per `interval` seconds, always ending
+    with the latest content. Must be created on the event loop; use
+    update_threadsafe from worker threads, e.g. for streamed handler output.
+    """
+
+    def __init__(self, channel, interval: float = DISCORD_EDIT_INTERVAL):
+        self.channel = channel
+        self.interval = interval
+        self.message = None
+        self._loop = asyncio.get_running_loop()
+        self._latest = None
+        self._flush_task = None
+        self._last_edit = 0.0
+        self._send_lock = asyncio.Lock()
+
+    def update(self, content: str):
+        """
+        Show `content` at the next allowed edit. Must be called on the event loop.
+        """
+        self._latest = content
+        if self._flush_task is None:
+            delay = max(0.0, self._last_edit + self.interval - time.monotonic())
+            self._flush_task = self._loop.create_task(self._flush_after(delay))
+
+    def update_threadsafe(self, content: str):
+        """
+        Like update, but safe to call from any thread.
+        """
+        self._loop.call_soon_threadsafe(self.update, content)
+
+    async def finish(self, content: str = None, embed=None, file=None):
+        """
+        Drop any pending update and show the final content and/or embed,
+        optionally with an attached discord.File.
+        """
+        # only a flush still waiting out its delay is cancelled; one already
+        # sending holds the send lock, so the final content is shown after it
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self._show(content, embed, file)
+
+    async def _flush_after(self, delay: float):
+        await asyncio.sleep(delay)
+        # clear the task before sending, so finish can't cancel a send in flight
+        # and leave the message created on Discord but unknown here
+        self._flush_task = None
+        await self._show(self._latest)
+
+    async def _show(self, content: str, embed=None, file=None):
+        if content:
+            content = content[:MAX_MESSAGE_LENGTH]
+        # one send/edit at a time, so the message is only created once
+        async with self._send_lock:
+            self._last_edit = time.monotonic()
+            if self.message is None:
+                self.message = await self.channel.send(content, embed=embed, file=file)
+            elif file is not None:
+                await self.message.edit(
+                    content=content, embed=embed, attachments=[file]
+                )
+            else:
+                await self.message.edit(content=content, embed=embed)
+
+
+class ProgressMessage:
+    """
+    One status message per job: a title, a line per step, and optional detail
+    text (e.g. content as it is generated), all edited in place.
+    """
+
+    def __init__(self, channel, title: str, interval: float = DISCORD_EDIT_INTERVAL):
+        self.title = title
+        self.steps = {}
+        self.detail = None
+        self._loop = asyncio.get_running_loop()
+        self._live = LiveMessage(channel, interval)
+
+    def set(self, step: str, status: str):
+        """
+        Set the status shown for a step. Must be called on the event loop.
+        """
+        self.steps[step] = status
+        self._live.update(self._render())
+
+    def set_detail_threadsafe(self, detail: str):
+        """
+        Set the detail text from any thread.
+        """
+        self._loop.call_soon_threadsafe(self._set_detail, detail)
+
+    def _set_detail(self, detail: str):
+        self.detail = detail
+        self._live.update(self._render())
+
+    def _render(self):
+        lines = [self.title]
+        lines += [f"- {step}: {status}" for step, status in self.steps.items()]
+        if self.detail:
+            lines += ["", self.detail]
+        return "\n".join(lines)
+
+    async def finish(self, embed=None, detail: str = None, file=None):
+        """
+        Show the final step statuses, replacing the detail text, plus an optional
+        embed and attached file.
+        """
+        self.detail = detail
+        await self._live.finish(self._render(), embed, file)
@@ -0,0 +1,96 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from .config import WORKER_POOL_SIZE
+
+# Shared, bounded pool for blocking handler calls (OpenAI, Airtable, HTTP).
+# Created on first use so importing this module stays cheap.
+_executor = None
+
+
+def get_executor():
+    """
+    Return the process-wide worker pool, creating it on first use.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=WORKER_POOL_SIZE, thread_name_prefix="handler"
+        )
+    return _executor
+
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    Run a blocking handler call in the worker pool without blocking the event loop.
+    The call runs in a copy of the caller's context, so spans it starts are
+    nested under the caller's.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        get_executor(), functools.partial(context.run, func, *args, **kwargs)
+    )
+
+
+def shutdown_executor(wait=True):
+    """
+    Shut down the worker pool, e.g. when the bot is closing.
+    """
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=wait)
+        _executor = None
+
+
+def _topological_order(stages):
+    """
+    Return stage names in dependency order, raising ValueError on unknown or cyclic deps.
+    """
+    remaining = {name: set(deps) for name, (_, deps) in stages.items()}
+    for name, deps in remaining.items():
+        unknown = deps - remaining.keys()
+        if unknown:
+            raise ValueError(f"Stage {name} depends on unknown stage(s): {unknown}")
+
+    order = []
+    while remaining:
+        ready = [name for name, deps in remaining.items() if not deps]
+        if not ready:
+            raise ValueError(f"Stage graph has a cycle: {sorted(remaining)}")
+        for name in ready:
+            order.append(name)
+            del remaining[name]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+    return order
+
+
+async def run_stage_graph(stages):
+    """
+    Run a DAG of async stages, starting each one as soon as its dependencies finish.
+
+    `stages` maps a stage name to `(async_func, [dependency names])`. Each function is
+    called with its dependencies' results as positional arguments, in the listed order.
+    Returns a dict of stage name to result. If any stage fails, the rest are cancelled.
+    """
+    tasks = {}
+
+    async def run_stage(name):
+        func, deps = stages[name]
+        dep_results = [await tasks[dep] for dep in deps]
+        return await func(*dep_results)
+
+    for name in _topological_order(stages):
+        tasks[name] = asyncio.create_task(run_stage(name))
+
+    try:
+        await asyncio.gather(*tasks.values())
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        raise
+
+    return {name: task.result() for name, task in tasks.items()}
@@ -0,0 +1,159 @@
+import base64
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ProtocolError, ReadTimeoutError
+
+from .config import (
+    FETCH_CONNECT_TIMEOUT,
+    FETCH_READ_TIMEOUT,
+    FETCH_TOTAL_TIMEOUT,
+    FETCH_MAX_BYTES,
+    FETCH_MAX_SESSIONS,
+    HTTP_CACHE_PATH,
+    HTTP_CACHE_TTL,
+    HTTP_CACHE_MAX_ENTRIES,
+    HTTP_CACHE_MAX_BODY_BYTES,
+    WORKER_POOL_SIZE,
+)
+from . import metrics
+from .disk_cache import DiskCache
+
+CHUNK_SIZE = 64 * 1024
+
+# One keep-alive session per host, shared across worker threads, for the
+# FETCH_MAX_SESSIONS most recently used hosts
+_sessions = OrderedDict()
+_sessions_lock = threading.Lock()
+
+# Cached bodies and validators for conditional GETs, opened on first use
+_http_cache = None
+_http_cache_lock = threading.Lock()
+
+
+def _get_session(url: str):
+    """
+    Return the pooled session for the URL's host, creating it on first use and
+    closing the least recently used one when there are too many.
+    """
+    parts = urlsplit(url)
+    host = f"{parts.scheme}://{parts.netloc}".lower()
+    evicted = None
+    with _sessions_lock:
+        if host not in _sessions:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=WORKER_POOL_SIZE)
+            session.mount(host, adapter)
+            _sessions[host] = session
+            if len(_sessions) > FETCH_MAX_SESSIONS:
+                _, evicted = _sessions.popitem(last=False)
+        _sessions.move_to_end(host)
+        session = _sessions[host]
+    # connections still in use are closed when they are released
+    if evicted is not None:
+        evicted.close()
+    return session
+
+
+def _get_http_cache():
+    global _http_cache
+    with _http_cache_lock:
+        if _http_cache is None:
+            _http_cache = DiskCache(
+                HTTP_CACHE_PATH, HTTP_CACHE_TTL, HTTP_CACHE_MAX_ENTRIES
+            )
+        return _http_cache
+
+
+def _read_body(response, url: str, max_bytes: int, deadline: float):
+    """
+    Read up to `max_bytes` of a streamed response, returning whatever data has
+    arrived on each read. Each socket read times out at the earlier of
+    FETCH_READ_TIMEOUT and the overall deadline, so a server trickling bytes
+    can't keep the fetch going past FETCH_TOTAL_TIMEOUT.
+    """
+    sock = getattr(response.raw.connection, "sock", None)
+    chunks = []
+    size = 0
+    while size < max_bytes:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise requests.Timeout(
+                f"Fetching {url} took longer than {FETCH_TOTAL_TIMEOUT}s"
+            )
+        if sock is not None:
+            sock.settimeout(min(FETCH_READ_TIMEOUT, remaining))
+        try:
+            chunk = response.raw.read1(CHUNK_SIZE, decode_content=True)
+        except (ReadTimeoutError, TimeoutError) as e:
+            if time.monotonic() >= deadline:
+                raise requests.Timeout(
+                    f"Fetching {url} took longer than {FETCH_TOTAL_TIMEOUT}s"
+                ) from e
+            raise requests.ReadTimeout(
+                f"No data from {url} for {FETCH_READ_TIMEOUT}s"
+            ) from e
+        except ProtocolError as e:
+            raise requests.ConnectionError(f"Connection to {url} broke: {e}") from e
+        if not chunk:
+            break
+        chunks.append(chunk)
+        size += len(chunk)
+    if size >= max_bytes:
+        print(f"Truncating {url} at {max_bytes} bytes")
+    return b"".join(chunks)[:max_bytes]
+
+
+def fetch_url(url: str, max_bytes: int = FETCH_MAX_BYTES):
+    """
+    Fetch a URL and return the response body as bytes.
+    Streams the body with connect/read timeouts and an overall deadline, truncates
+    it at `max_bytes`, and revalidates previously fetched URLs with ETag /
+    If-Modified-Since so unchanged pages come back as a bodyless 304.
+    Raises requests.RequestException on failure.
+    """
+    cache = _get_http_cache()
+    cached = cache.get(url)
+    if cached and "zbody" not in cached:
+        # written before bodies were compressed
+        cached = None
+
+    headers = {}
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    deadline = time.monotonic() + FETCH_TOTAL_TIMEOUT
+    with _get_session(url).get(
+        url,
+        headers=headers,
+        stream=True,
+        timeout=(FETCH_CONNECT_TIMEOUT, min(FETCH_READ_TIMEOUT, FETCH_TOTAL_TIMEOUT)),
+    ) as response:
+        if cached:
+            metrics.cache_lookup("http", response.status_code == 304)
+        if response.status_code == 304 and cached:
+            return zlib.decompress(base64.b64decode(cached["zbody"]))
+        response.raise_for_status()
+        body = _read_body(response, url, max_bytes, deadline)
+
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+
+    if (etag or last_modified) and len(body) <= HTTP_CACHE_MAX_BODY_BYTES:
+        cache.set(
+            url,
+            {
+                "etag": etag,
+                "last_modified": last_modified,
+                "zbody": base64.b64encode(zlib.compress(body)).decode("ascii"),
+            },
+        )
+    return body
@@ -0,0 +1,151 @@
+import re
+
+from .config import ARTICLE_EXTRACTOR
+
+try:
+    import lxml.html
+except ImportError:  # lxml is optional, fall back to BeautifulSoup
+    lxml = None
+
+# Elements that never hold article text
+DROP_TAGS = [
+    "script",
+    "style",
+    "noscript",
+    "nav",
+    "header",
+    "footer",
+    "aside",
+    "form",
+    "button",
+    "iframe",
+    "svg",
+    "figure",
+]
+
+# class/id hints for page furniture and for likely article containers
+NEGATIVE_HINTS = re.compile(
+    r"comment|footer|footnote|masthead|menu|nav|newsletter|promo|related|"
+    r"share|sidebar|social|sponsor|subscribe|widget|advert|\bad-|cookie|banner",
+    re.I,
+)
+POSITIVE_HINTS = re.compile(r"article|body|content|entry|main|post|story|text", re.I)
+
+# paragraphs shorter than this are usually captions, bylines or buttons
+MIN_PARAGRAPH_CHARS = 25
+# below this the heuristic probably picked the wrong container
+MIN_MAIN_CONTENT_CHARS = 250
+
+
+def extract_paragraphs(html):
+    """
+    Join the text of every <p> in the page, parsed with BeautifulSoup.
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    return " ".join([p.get_text() for p in soup.find_all("p")])
+
+
+def _class_weight(element):
+    hints = f"{element.get('class', '')} {element.get('id', '')}"
+    weight = 0
+    if NEGATIVE_HINTS.search(hints):
+        weight -= 25
+    if POSITIVE_HINTS.search(hints):
+        weight += 25
+    return weight
+
+
+def _link_density(element):
+    text_length = len(element.text_content()) or 1
+    link_length = sum(len(link.text_content()) for link in element.iter("a"))
+    return link_length / text_length
+
+
+def _inside_text_element(element, container, text_tags):
+    for ancestor in element.iterancestors():
+        if ancestor is container:
+            return False
+        if ancestor.tag in text_tags:
+            return True
+    return False
+
+
+def extract_main_content(html):
+    """
+    Extract the article body with lxml and a readability-style heuristic:
+    paragraphs score their parent containers by length and punctuation, the
+    best-scoring container (adjusted for class hints and link density) wins,
+    and only its paragraphs are returned.
+    Falls back to extract_paragraphs if lxml is missing or nothing scores well.
+    """
+    if lxml is None:
+        return extract_paragraphs(html)
+
+    if isinstance(html, str):
+        html = html.encode("utf-8")
+    try:
+        document = lxml.html.fromstring(html)
+    except (ValueError, lxml.etree.ParserError):
+        return extract_paragraphs(html)
+
+    for element in document.xpath("|".join(f"//{tag}" for tag in DROP_TAGS)):
+        element.drop_tree()
+    for element in document.xpath("//*[@class or @id]"):
+        hints = f"{element.get('class', '')} {element.get('id', '')}"
+        if NEGATIVE_HINTS.search(hints) and not POSITIVE_HINTS.search(hints):
+            if element.getparent() is not None and element.tag not in ("html", "body"):
+                element.drop_tree()
+
+    scores = {}
+    for paragraph in document.iter("p"):
+        text = paragraph.text_content().strip()
+        if len(text) < MIN_PARAGRAPH_CHARS:
+            continue
+        score = 1 + text.count(",") + min(len(text) // 100, 3)
+        parent = paragraph.getparent()
+        if parent is None:
+            continue
+        grandparent = parent.getparent()
+        for container, share in ((parent, 1), (grandparent, 0.5)):
+            if container is None:
+                continue
+            if container not in scores:
+                scores[container] = _class_weight(container)
+            scores[container] += score * share
+
+    if not scores:
+        return extract_paragraphs(html)
+
+    best = max(
+        scores, key=lambda element: scores[element] * (1 - _link_density(element))
+    )
+    text_tags = ("p", "h2", "h3", "blockquote", "li")
+    paragraphs = []
+    for element in best.iter(*text_tags):
+        # skip text already collected through an enclosing element
+        if _inside_text_element(element, best, text_tags):
+            continue
+        text = element.text_content().strip()
+        if text:
+            paragraphs.append(text)
+    content = " ".join(paragraphs)
+    if len(content) < MIN_MAIN_CONTENT_CHARS:
+        return extract_paragraphs(html)
+    return content
+
+
+EXTRACTORS = {
+    "main_content": extract_main_content,
+    "paragraphs": extract_paragraphs,
+}
+
+
+def extract_text(html, engine: str = ARTICLE_EXTRACTOR):
+    """
+    Extract article text from raw HTML with the named engine.
+    """
+    if engine not in EXTRACTORS:
+        raise ValueError(f"Unknown article extractor: {engine}")
+    return EXTRACTORS[engine](html)
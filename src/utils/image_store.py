@@ -0,0 +1,81 @@
+import hashlib
+import os
+
+from .config import IMAGE_STORE_DIR
+
+# Stored images are referenced by keys like "sha256:<hex digest of the bytes>"
+KEY_PREFIX = "sha256:"
+
+
+def is_key(value: str):
+    """
+    Return True if `value` is an image store key rather than a URL.
+    """
+    return bool(value) and value.startswith(KEY_PREFIX)
+
+
+def _digest(data: bytes):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _image_path(key: str):
+    digest = key[len(KEY_PREFIX) :]
+    return os.path.join(IMAGE_STORE_DIR, digest[:2], digest)
+
+
+def _prompt_path(prompt_key: str):
+    return os.path.join(IMAGE_STORE_DIR, "prompts", prompt_key)
+
+
+def _write(path: str, data: bytes):
+    # write to a temporary file first so readers never see a partial image
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def put(data: bytes):
+    """
+    Store image bytes and return their key. Storing the same bytes twice is a no-op.
+    """
+    key = KEY_PREFIX + _digest(data)
+    path = _image_path(key)
+    if not os.path.exists(path):
+        _write(path, data)
+    return key
+
+
+def get(key: str):
+    """
+    Return the bytes stored under `key`. Raises FileNotFoundError if missing.
+    """
+    with open(_image_path(key), "rb") as f:
+        return f.read()
+
+
+def prompt_key(*parts: str):
+    """
+    Return a key identifying everything an image was generated from.
+    """
+    return _digest("\n".join(parts).encode("utf-8"))
+
+
+def get_for_prompt(prompt_key: str):
+    """
+    Return the key of the image previously generated for `prompt_key`, or None.
+    """
+    try:
+        with open(_prompt_path(prompt_key)) as f:
+            key = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return key if os.path.exists(_image_path(key)) else None
+
+
+def set_for_prompt(prompt_key: str, key: str):
+    """
+    Remember that `key` is the image generated for `prompt_key`.
+    """
+    _write(_prompt_path(prompt_key), key.encode("utf-8"))
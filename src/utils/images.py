@@ -0,0 +1,57 @@
+import io
+
+import requests
+
+from .config import FETCH_CONNECT_TIMEOUT, FETCH_READ_TIMEOUT
+
+CHUNK_SIZE = 64 * 1024
+
+# refuse to buffer downloads larger than this
+MAX_DOWNLOAD_BYTES = 20 * 1024 * 1024
+
+# JPEG qualities tried, in order, when an image has to be shrunk
+JPEG_QUALITIES = (90, 80, 70, 60)
+
+
+def download_image(url: str, max_bytes: int = MAX_DOWNLOAD_BYTES):
+    """
+    Download an image into memory and return its bytes.
+    Raises ValueError if it is larger than `max_bytes`.
+    """
+    with requests.get(
+        url, stream=True, timeout=(FETCH_CONNECT_TIMEOUT, FETCH_READ_TIMEOUT)
+    ) as response:
+        response.raise_for_status()
+        buffer = io.BytesIO()
+        for chunk in response.iter_content(CHUNK_SIZE):
+            buffer.write(chunk)
+            if buffer.tell() > max_bytes:
+                raise ValueError(f"Image at {url} is larger than {max_bytes} bytes")
+    return buffer.getvalue()
+
+
+def fit_image(data: bytes, max_bytes: int, max_side: int):
+    """
+    Return (data, extension) for an image within `max_bytes` and `max_side`
+    pixels per side. Images that already fit are returned unchanged; others are
+    downscaled and re-encoded as JPEG with Pillow. Without Pillow the image is
+    returned as is.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return data, "png"
+
+    with Image.open(io.BytesIO(data)) as image:
+        extension = (image.format or "png").lower()
+        if len(data) <= max_bytes and max(image.size) <= max_side:
+            return data, extension
+
+        image = image.convert("RGB")
+        image.thumbnail((max_side, max_side))
+        for quality in JPEG_QUALITIES:
+            buffer = io.BytesIO()
+            image.save(buffer, format="JPEG", quality=quality, optimize=True)
+            if buffer.tell() <= max_bytes:
+                break
+        return buffer.getvalue(), "jpg"
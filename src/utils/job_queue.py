@@ -0,0 +1,228 @@
+import json
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+
+from .config import JOB_QUEUE_PATH, JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS
+
+# Pipeline stages, in order. A job records the last stage it finished so a
+# restarted worker can resume from the next one.
+STAGES = ["fetch", "extract", "generate", "image", "persist"]
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class LeaseLostError(Exception):
+    """
+    Raised when a worker writes to a job it no longer holds, e.g. because its
+    lease expired and another worker claimed the job.
+    """
+
+
+class JobQueue:
+    """
+    Durable SQLite-backed queue of article jobs, shared by the bot and worker processes.
+    Workers claim jobs with a lease; a job whose worker dies is picked up again
+    once its lease expires. Each claim gets a new token, and writes for the job
+    only succeed with the current token, so a worker that lost its lease can't
+    overwrite the new owner's progress.
+    """
+
+    def __init__(self, path: str, lease_seconds: float, max_attempts: int):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "url TEXT NOT NULL, "
+                "status TEXT NOT NULL, "
+                "stage TEXT, "
+                "state TEXT NOT NULL, "
+                "error TEXT, "
+                "attempts INTEGER NOT NULL DEFAULT 0, "
+                "worker TEXT, "
+                "token TEXT, "
+                "lease_until REAL, "
+                "created REAL NOT NULL, "
+                "updated REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status)")
+            # queues created before claim tokens
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(jobs)")]
+            if "token" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN token TEXT")
+
+    @contextmanager
+    def _connect(self):
+        # a fresh connection per call keeps the queue safe across threads and processes
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def enqueue(self, url: str, state: dict = None):
+        """
+        Add a job for the URL and return its ID.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO jobs (url, status, state, created, updated) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (url, QUEUED, json.dumps(state or {}), now, now),
+            )
+            return cursor.lastrowid
+
+    def claim(self, worker: str):
+        """
+        Claim the oldest queued job, or a running job whose lease has expired.
+        Expired jobs that have used up their attempts are failed instead.
+        Return the job as a dict, including the claim `token` that its later
+        writes need, or None if there is nothing to do.
+        """
+        now = time.time()
+        token = uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, token = NULL, "
+                "lease_until = NULL, updated = ? "
+                "WHERE status = ? AND lease_until < ? AND attempts >= ?",
+                (
+                    FAILED,
+                    "Lease expired on the last attempt",
+                    now,
+                    RUNNING,
+                    now,
+                    self.max_attempts,
+                ),
+            )
+            row = conn.execute(
+                "SELECT id FROM jobs "
+                "WHERE status = ? OR (status = ? AND lease_until < ?) "
+                "ORDER BY id LIMIT 1",
+                (QUEUED, RUNNING, now),
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, worker = ?, token = ?, lease_until = ?, "
+                "attempts = attempts + 1, updated = ? WHERE id = ?",
+                (RUNNING, worker, token, now + self.lease_seconds, now, row[0]),
+            )
+            conn.execute("COMMIT")
+        return self.get(row[0])
+
+    def _update_owned(self, conn, job_id: int, token: str, assignments: str, params):
+        """
+        Update a running job the caller still holds, raising LeaseLostError if
+        another worker has claimed it since.
+        """
+        cursor = conn.execute(
+            f"UPDATE jobs SET {assignments} "
+            "WHERE id = ? AND token = ? AND status = ?",
+            (*params, job_id, token, RUNNING),
+        )
+        if cursor.rowcount == 0:
+            raise LeaseLostError(f"Job {job_id} is no longer held by this worker")
+
+    def heartbeat(self, job_id: int, token: str):
+        """
+        Renew the lease, e.g. periodically while a long stage runs.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            self._update_owned(
+                conn,
+                job_id,
+                token,
+                "lease_until = ?, updated = ?",
+                (now + self.lease_seconds, now),
+            )
+
+    def checkpoint(self, job_id: int, token: str, stage: str, state: dict):
+        """
+        Record that `stage` finished with the given state, and renew the lease.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            self._update_owned(
+                conn,
+                job_id,
+                token,
+                "stage = ?, state = ?, lease_until = ?, updated = ?",
+                (stage, json.dumps(state), now + self.lease_seconds, now),
+            )
+
+    def complete(self, job_id: int, token: str):
+        """
+        Mark a job as done.
+        """
+        with self._connect() as conn:
+            self._update_owned(
+                conn,
+                job_id,
+                token,
+                "status = ?, error = NULL, token = NULL, lease_until = NULL, "
+                "updated = ?",
+                (DONE, time.time()),
+            )
+
+    def fail(self, job_id: int, token: str, error: str):
+        """
+        Record a failed attempt. The job is queued again until it runs out of attempts.
+        Return the job's new status.
+        """
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT attempts FROM jobs WHERE id = ? AND token = ?",
+                    (job_id, token),
+                ).fetchone()
+                status = QUEUED if row and row[0] < self.max_attempts else FAILED
+                self._update_owned(
+                    conn,
+                    job_id,
+                    token,
+                    "status = ?, error = ?, token = NULL, lease_until = NULL, "
+                    "updated = ?",
+                    (status, error, time.time()),
+                )
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        return status
+
+    def get(self, job_id: int):
+        """
+        Return a job as a dict, or None if it doesn't exist.
+        """
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["state"] = json.loads(job["state"])
+        return job
+
+
+def get_job_queue():
+    """
+    Return a JobQueue for the configured database.
+    """
+    return JobQueue(JOB_QUEUE_PATH, JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS)
@@ -0,0 +1,232 @@
+import contextlib
+import functools
+import inspect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .config import METRICS_HOST, METRICS_PORT, METRICS_OTEL
+
+# Histogram buckets for durations, in seconds
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# In-process registry: metric name -> type, and (name, labels) -> value.
+# Labels are stored as sorted tuples of (name, value) pairs.
+_types = {}
+_values = {}
+_lock = threading.Lock()
+
+# OpenTelemetry tracer, set up on first use when METRICS_OTEL is on
+_tracer = None
+_tracer_ready = False
+_tracer_lock = threading.Lock()
+
+_server = None
+
+
+def _key(name: str, labels: dict):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name: str, amount: float = 1, **labels):
+    """
+    Add `amount` to a counter.
+    """
+    with _lock:
+        _types.setdefault(name, "counter")
+        key = _key(name, labels)
+        _values[key] = _values.get(key, 0) + amount
+
+
+def set_gauge(name: str, value: float, **labels):
+    """
+    Set a gauge to `value`.
+    """
+    with _lock:
+        _types.setdefault(name, "gauge")
+        _values[_key(name, labels)] = value
+
+
+def observe(name: str, value: float, **labels):
+    """
+    Record a value, e.g. a duration in seconds, in a histogram.
+    """
+    with _lock:
+        _types.setdefault(name, "histogram")
+        key = _key(name, labels)
+        buckets, total, count = _values.get(key, ([0] * len(DURATION_BUCKETS), 0, 0))
+        buckets = [n + (value <= bound) for n, bound in zip(buckets, DURATION_BUCKETS)]
+        _values[key] = (buckets, total + value, count + 1)
+
+
+def cache_lookup(cache: str, hit: bool):
+    """
+    Count a hit or miss for one of the caches.
+    """
+    inc("cache_requests_total", cache=cache, result="hit" if hit else "miss")
+
+
+def record_usage(operation: str, usage):
+    """
+    Count the tokens reported in an OpenAI response's (or run's) usage.
+    """
+    if usage is None:
+        return
+    inc("openai_tokens_total", usage.prompt_tokens, operation=operation, kind="prompt")
+    inc(
+        "openai_tokens_total",
+        usage.completion_tokens,
+        operation=operation,
+        kind="completion",
+    )
+
+
+def _get_tracer():
+    """
+    Return an OpenTelemetry tracer exporting over OTLP, or None if export is
+    off or the OpenTelemetry packages aren't installed.
+    """
+    global _tracer, _tracer_ready
+    with _tracer_lock:
+        if not _tracer_ready:
+            _tracer_ready = True
+            if METRICS_OTEL:
+                try:
+                    from opentelemetry import trace
+                    from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+                        OTLPSpanExporter,
+                    )
+                    from opentelemetry.sdk.resources import Resource
+                    from opentelemetry.sdk.trace import TracerProvider
+                    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+                    provider = TracerProvider(
+                        resource=Resource.create({"service.name": "article-bot"})
+                    )
+                    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+                    trace.set_tracer_provider(provider)
+                    _tracer = trace.get_tracer(__name__)
+                except ImportError as e:
+                    print(f"OpenTelemetry export disabled: {str(e)}")
+        return _tracer
+
+
+@contextlib.contextmanager
+def span(name: str, **labels):
+    """
+    Time a block as a pipeline stage or external call. The duration goes to the
+    span_duration_seconds histogram, failures to span_errors_total, and the span
+    is exported with OpenTelemetry when enabled. Keep labels low-cardinality.
+    """
+    tracer = _get_tracer()
+    with contextlib.ExitStack() as stack:
+        if tracer is not None:
+            stack.enter_context(tracer.start_as_current_span(name, attributes=labels))
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            inc("span_errors_total", span=name, **labels)
+            raise
+        finally:
+            observe(
+                "span_duration_seconds",
+                time.perf_counter() - start,
+                span=name,
+                **labels,
+            )
+
+
+def traced(name: str, **labels):
+    """
+    Decorator that runs a function, or coroutine function, inside a span.
+    """
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name, **labels):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, **labels):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _format_labels(labels, extra=()):
+    pairs = [*labels, *extra]
+    if not pairs:
+        return ""
+    escaped = (
+        (k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in pairs
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+def render():
+    """
+    Return every metric in the Prometheus text exposition format.
+    """
+    with _lock:
+        values = sorted(_values.items())
+        types = dict(_types)
+
+    lines = []
+    for name in sorted(types):
+        lines.append(f"# TYPE {name} {types[name]}")
+        for (metric, labels), value in values:
+            if metric != name:
+                continue
+            if types[name] != "histogram":
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+                continue
+            buckets, total, count = value
+            for bound, n in zip(DURATION_BUCKETS, buckets):
+                extra = [("le", str(bound))]
+                lines.append(f"{name}_bucket{_format_labels(labels, extra)} {n}")
+            extra = [("le", "+Inf")]
+            lines.append(f"{name}_bucket{_format_labels(labels, extra)} {count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_metrics_server(port: int = METRICS_PORT, host: str = METRICS_HOST):
+    """
+    Serve /metrics on a background thread, unless `port` is 0.
+    Return the server, or None if it isn't running.
+    """
+    global _server
+    if not port or _server is not None:
+        return _server
+    _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    _server.daemon_threads = True
+    threading.Thread(target=_server.serve_forever, daemon=True).start()
+    print(f"Serving metrics on http://{host}:{port}/metrics")
+    return _server
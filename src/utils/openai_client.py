@@ -0,0 +1,195 @@
+import random
+import re
+import threading
+import time
+from typing import TYPE_CHECKING
+
+from . import metrics
+from .circuit_breaker import CircuitBreaker
+from .config import (
+    OPENAI_API_KEY,
+    OPENAI_VARS,
+    OPENAI_TIMEOUT,
+    OPENAI_CONNECT_TIMEOUT,
+    OPENAI_MAX_CONNECTIONS,
+    OPENAI_MAX_RETRIES,
+    OPENAI_BACKOFF_BASE,
+    OPENAI_BACKOFF_MAX,
+    OPENAI_BREAKER_THRESHOLD,
+    OPENAI_BREAKER_RESET,
+    require_env,
+)
+
+# httpx and the OpenAI SDK are imported when the client is first created, so
+# entry points that never call OpenAI don't pay for them at startup
+if TYPE_CHECKING:
+    import httpx
+
+# Responses worth retrying: rate limits and server errors
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+# Opened by repeated OpenAI failures; checked before starting new pipeline work
+openai_breaker = CircuitBreaker(OPENAI_BREAKER_THRESHOLD, OPENAI_BREAKER_RESET)
+
+# One client (and connection pool) per process, created on first use
+_client = None
+_client_lock = threading.Lock()
+
+
+def _endpoint(request: "httpx.Request"):
+    """
+    Return the request path with object IDs replaced, e.g. /v1/threads/{id}/runs.
+    """
+    return re.sub(r"/[a-z]+_[A-Za-z0-9]+", "/{id}", request.url.path)
+
+
+def _retry_after(response: "httpx.Response"):
+    """
+    Return the delay the server asked for in seconds, or None.
+    """
+    try:
+        if "retry-after-ms" in response.headers:
+            return float(response.headers["retry-after-ms"]) / 1000
+        if "retry-after" in response.headers:
+            return float(response.headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
+
+def _record_rate_limit(response: "httpx.Response"):
+    """
+    Record the request and token headroom OpenAI reports for the API key.
+    """
+    for kind in ("requests", "tokens"):
+        remaining = response.headers.get(f"x-ratelimit-remaining-{kind}")
+        if remaining is not None and remaining.isdigit():
+            metrics.set_gauge("openai_rate_limit_remaining", int(remaining), kind=kind)
+
+
+class _RetryTransport:
+    """
+    Transport that retries rate-limited, failed and unreachable requests with
+    jittered exponential backoff, honoring retry-after. A retry-after from one
+    request holds back every request on the client. Final outcomes are
+    recorded on the circuit breaker. Implements httpx's transport interface.
+    """
+
+    def __init__(self, transport: "httpx.BaseTransport", breaker: CircuitBreaker):
+        self.transport = transport
+        self.breaker = breaker
+        self._not_before = 0.0
+        self._lock = threading.Lock()
+
+    def _backoff(self, attempt: int, retry_after=None):
+        delay = random.uniform(
+            0, min(OPENAI_BACKOFF_MAX, OPENAI_BACKOFF_BASE * 2**attempt)
+        )
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+            with self._lock:
+                self._not_before = max(self._not_before, time.monotonic() + delay)
+        return delay
+
+    def _wait_for_turn(self):
+        with self._lock:
+            wait = self._not_before - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+
+    def handle_request(self, request: "httpx.Request"):
+        import httpx
+
+        endpoint = _endpoint(request)
+        for attempt in range(OPENAI_MAX_RETRIES + 1):
+            if attempt:
+                metrics.inc("openai_retries_total", endpoint=endpoint)
+            self._wait_for_turn()
+            try:
+                # streamed responses are timed until their headers arrive
+                with metrics.span("openai", endpoint=endpoint):
+                    response = self.transport.handle_request(request)
+            except httpx.TransportError:
+                if attempt == OPENAI_MAX_RETRIES:
+                    self.breaker.record_failure()
+                    raise
+                time.sleep(self._backoff(attempt))
+                continue
+            metrics.inc(
+                "openai_responses_total",
+                endpoint=endpoint,
+                status=response.status_code,
+            )
+            _record_rate_limit(response)
+
+            if response.status_code not in RETRY_STATUSES:
+                self.breaker.record_success()
+                return response
+            if attempt == OPENAI_MAX_RETRIES:
+                self.breaker.record_failure()
+                return response
+
+            delay = self._backoff(attempt, _retry_after(response))
+            print(f"OpenAI returned {response.status_code}, retrying in {delay:.1f}s")
+            response.close()
+            time.sleep(delay)
+
+    def close(self):
+        self.transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def get_openai_client():
+    """
+    Return the process-wide OpenAI client, creating it on first use.
+    Its connection pool is sized for the worker threads, every call has a
+    timeout, and retries are handled by the transport rather than the SDK.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            require_env(*OPENAI_VARS)
+            import httpx
+            from openai import OpenAI
+
+            transport = httpx.HTTPTransport(
+                limits=httpx.Limits(
+                    max_connections=OPENAI_MAX_CONNECTIONS,
+                    max_keepalive_connections=OPENAI_MAX_CONNECTIONS,
+                ),
+            )
+            _client = OpenAI(
+                api_key=OPENAI_API_KEY,
+                max_retries=0,
+                http_client=httpx.Client(
+                    transport=_RetryTransport(transport, openai_breaker),
+                    timeout=httpx.Timeout(
+                        OPENAI_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT
+                    ),
+                ),
+            )
+        return _client
+
+
+# For local testing: a connection error is retried, then recorded on the breaker
+if __name__ == "__main__":
+    import httpx
+
+    class _FailingTransport(httpx.BaseTransport):
+        def handle_request(self, request):
+            raise httpx.ConnectError("Connection refused", request=request)
+
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    transport = _RetryTransport(_FailingTransport(), breaker)
+    try:
+        transport.handle_request(
+            httpx.Request("GET", "https://api.openai.com/v1/models")
+        )
+    except httpx.ConnectError as e:
+        print(f"ConnectError after {OPENAI_MAX_RETRIES} retries: {str(e)}")
+    print(f"Breaker open: {breaker.is_open()}")
@@ -0,0 +1,33 @@
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Thread-safe limiter that spaces calls to at most `rate` per `per` seconds.
+    """
+
+    def __init__(self, rate: float, per: float = 1.0):
+        self.interval = per / rate
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Block until the caller is allowed to make its next call.
+        Return the number of seconds waited.
+        """
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+        return max(wait, 0.0)
+
+    def pause(self, seconds: float):
+        """
+        Hold back every caller for at least `seconds`, e.g. after a 429 response.
+        """
+        with self._lock:
+            self._next_slot = max(self._next_slot, time.monotonic() + seconds)
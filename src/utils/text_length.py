@@ -0,0 +1,118 @@
+import re
+import unicodedata
+
+# Weighted text length as X (Twitter) counts it, following the twitter-text v3 rules:
+# text is NFC-normalized, most Latin/punctuation code points weigh 1, everything else
+# (CJK, emoji, ...) weighs 2, an emoji sequence counts once, and every URL counts as 23.
+# Like twitter-text, bare domains such as example.com count as URLs when their TLD is
+# known, except a single name under a country code (e.g. setup.py) with no path.
+
+MAX_TWEET_LENGTH = 280
+URL_LENGTH = 23
+DEFAULT_WEIGHT = 2
+
+# Code point ranges that weigh 1; everything else weighs DEFAULT_WEIGHT
+LIGHT_RANGES = [(0, 4351), (8192, 8205), (8208, 8223), (8242, 8247)]
+
+# Weight lookup table for every code point up to the end of the last light range
+_WEIGHTS = bytearray([DEFAULT_WEIGHT]) * (LIGHT_RANGES[-1][1] + 1)
+for _start, _end in LIGHT_RANGES:
+    _WEIGHTS[_start : _end + 1] = b"\x01" * (_end - _start + 1)
+_TABLE_SIZE = len(_WEIGHTS)
+
+# Top-level domains X links without a protocol: common generic TLDs and every
+# country code
+GENERIC_TLDS = """
+    academy aero agency app art asia bank biz blog cafe capital cat center city
+    cloud club com company consulting coop design dev digital eco edu email energy
+    events expert family finance fun fund game games gay global gov green group
+    guide health house inc info institute int jobs land law legal life link live
+    llc love ltd market marketing media mil mobi money museum name net network new
+    news one online org page photo photos press pro run school science services
+    shop site social software solutions space store studio systems tech tel today
+    tools travel university ventures video website wiki works world xxx xyz zone
+""".split()
+COUNTRY_TLDS = """
+    ac ad ae af ag ai al am ao aq ar as at au aw ax az ba bb bd be bf bg bh bi bj
+    bm bn bo br bs bt bv bw by bz ca cc cd cf cg ch ci ck cl cm cn co cr cu cv cw
+    cx cy cz de dj dk dm do dz ec ee eg er es et eu fi fj fk fm fo fr ga gb gd ge
+    gf gg gh gi gl gm gn gp gq gr gs gt gu gw gy hk hm hn hr ht hu id ie il im in
+    io iq ir is it je jm jo jp ke kg kh ki km kn kp kr kw ky kz la lb lc li lk lr
+    ls lt lu lv ly ma mc md me mg mh mk ml mm mn mo mp mq mr ms mt mu mv mw mx my
+    mz na nc ne nf ng ni nl no np nr nu nz om pa pe pf pg ph pk pl pm pn pr ps pt
+    pw py qa re ro rs ru rw sa sb sc sd se sg sh si sj sk sl sm sn so sr ss st su
+    sv sx sy sz tc td tf tg th tj tk tl tm tn to tr tt tv tw tz ua ug uk us uy uz
+    va vc ve vg vi vn vu wf ws ye yt za zm zw
+""".split()
+# country codes whose short domains (e.g. t.co) are linked even without a path
+SHORT_DOMAIN_TLDS = {"co", "tv"}
+
+_URL_END = r"[^\s<>\"'.,:;!?)\]}]"
+_URL = rf"(?:https?://|www\.)[^\s<>\"]+{_URL_END}"
+_TLD = "|".join(sorted(GENERIC_TLDS + COUNTRY_TLDS, key=len, reverse=True))
+_DOMAIN = (
+    r"(?<![\w\-./@#$])"  # not part of a longer word, path, mention or hashtag
+    r"(?P<host>(?:[a-z0-9](?:[a-z0-9-]*[a-z0-9])?\.)+"
+    rf"(?P<tld>{_TLD}))(?![a-z0-9-])"
+    rf"(?P<path>/(?:[^\s<>\"]*{_URL_END})?)?"
+)
+_EMOJI_BASE = (
+    r"[\U0001F000-\U0001FAFF\u2300-\u23FF\u2600-\u27BF\u2B00-\u2BFF]"
+    r"(?:\uFE0F|[\U0001F3FB-\U0001F3FF])?[\U000E0020-\U000E007F]*"
+)
+_EMOJI = (
+    r"[\U0001F1E6-\U0001F1FF]{2}"  # flags
+    r"|[0-9#*]\uFE0F?\u20E3"  # keycaps
+    rf"|{_EMOJI_BASE}(?:\u200D{_EMOJI_BASE})*"  # ZWJ sequences
+)
+_TOKEN = re.compile(
+    rf"(?P<url>{_URL})|(?P<domain>{_DOMAIN})|(?P<emoji>{_EMOJI})", re.IGNORECASE
+)
+
+
+def _plain_length(text: str):
+    if text.isascii():
+        return len(text)
+    return sum(
+        _WEIGHTS[code] if code < _TABLE_SIZE else DEFAULT_WEIGHT
+        for code in map(ord, text)
+    )
+
+
+def _is_linked_domain(match):
+    tld = match.group("tld").lower()
+    if match.group("path") or tld not in COUNTRY_TLDS or tld in SHORT_DOMAIN_TLDS:
+        return True
+    # a single name under a country code, e.g. setup.py, isn't linked
+    return match.group("host").count(".") > 1
+
+
+def _token_length(match):
+    if match.group("url"):
+        return URL_LENGTH
+    if match.group("domain"):
+        if _is_linked_domain(match):
+            return URL_LENGTH
+        return _plain_length(match.group())
+    return DEFAULT_WEIGHT
+
+
+def weighted_length(text: str):
+    """
+    Return the length of `text` as X counts it against the 280 character limit.
+    """
+    text = unicodedata.normalize("NFC", text)
+    length = 0
+    position = 0
+    for match in _TOKEN.finditer(text):
+        length += _plain_length(text[position : match.start()])
+        length += _token_length(match)
+        position = match.end()
+    return length + _plain_length(text[position:])
+
+
+def fits_tweet(text: str, max_length: int = MAX_TWEET_LENGTH):
+    """
+    Return True if `text` is within `max_length` as X counts it.
+    """
+    return weighted_length(text) <= max_length
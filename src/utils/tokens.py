@@ -0,0 +1,86 @@
+import re
+import threading
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken is optional, fall back to an estimate
+    tiktoken = None
+
+# Encoding used by gpt-4o and gpt-4o-mini. tiktoken downloads it once and caches it
+# (see TIKTOKEN_CACHE_DIR); without it, counts are estimated from character length.
+TOKENIZER_ENCODING = "o200k_base"
+CHARS_PER_TOKEN = 4
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n+")
+
+_encoding = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    global _encoding, _encoding_loaded
+    with _encoding_lock:
+        if not _encoding_loaded:
+            _encoding_loaded = True
+            if tiktoken is not None:
+                try:
+                    _encoding = tiktoken.get_encoding(TOKENIZER_ENCODING)
+                except Exception as e:
+                    print(f"Tokenizer unavailable, estimating token counts: {str(e)}")
+    return _encoding
+
+
+def count_tokens(text: str):
+    """
+    Count the tokens in `text`, or estimate them if no tokenizer is available.
+    """
+    encoding = _get_encoding()
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int):
+    """
+    Return the longest prefix of `text` that fits in `max_tokens`.
+    """
+    encoding = _get_encoding()
+    if encoding is None:
+        return text[: max_tokens * CHARS_PER_TOKEN]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
+
+
+def split_into_chunks(text: str, max_tokens: int):
+    """
+    Split `text` into chunks of at most `max_tokens`, breaking between sentences.
+    """
+    chunks = []
+    current = []
+    current_tokens = 0
+    for sentence in SENTENCE_BOUNDARY.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        sentence_tokens = count_tokens(sentence)
+
+        # a single sentence over the limit is cut into pieces
+        while sentence_tokens > max_tokens:
+            piece = truncate_to_tokens(sentence, max_tokens)
+            chunks.append(piece)
+            sentence = sentence[len(piece) :].strip()
+            sentence_tokens = count_tokens(sentence)
+
+        if current and current_tokens + sentence_tokens > max_tokens:
+            chunks.append(" ".join(current))
+            current, current_tokens = [], 0
+        if sentence:
+            current.append(sentence)
+            current_tokens += sentence_tokens
+
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
@@ -0,0 +1,70 @@
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = {
+    "fbclid",
+    "gclid",
+    "dclid",
+    "msclkid",
+    "igshid",
+    "mc_cid",
+    "mc_eid",
+    "ref",
+    "ref_src",
+    "cmpid",
+    "smid",
+    "s_cid",
+}
+TRACKING_PREFIXES = ("utm_",)
+
+
+def _is_tracking_param(name: str):
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def normalize_url(url: str):
+    """
+    Normalize a URL so the same article always maps to the same string.
+    Lowercases the scheme and host, drops default ports, fragments, trailing
+    slashes and tracking parameters, and sorts the remaining query parameters.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and not (
+        (scheme == "http" and parts.port == 80)
+        or (scheme == "https" and parts.port == 443)
+    ):
+        host = f"{host}:{parts.port}"
+
+    path = parts.path.rstrip("/") or "/"
+    query = urlencode(
+        sorted(
+            (name, value)
+            for name, value in parse_qsl(parts.query, keep_blank_values=True)
+            if not _is_tracking_param(name)
+        )
+    )
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+def extract_urls(text: str):
+    """
+    Return the words in `text` that look like URLs.
+    """
+    return [word for word in text.split() if word.startswith("http")]
+
+
+def dedupe_urls(urls):
+    """
+    Drop URLs that normalize to one already seen, keeping the first occurrence.
+    """
+    seen = set()
+    unique = []
+    for url in urls:
+        key = normalize_url(url)
+        if key not in seen:
+            seen.add(key)
+            unique.append(url)
+    return unique
@@ -0,0 +1,129 @@
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+from .pipeline import STAGE_FUNCTIONS
+from .utils import metrics
+from .utils.config import (
+    JOB_WORKERS,
+    JOB_POLL_INTERVAL,
+    METRICS_PORT,
+    OPENAI_VARS,
+    AIRTABLE_VARS,
+    require_env,
+)
+from .utils.job_queue import DONE, STAGES, LeaseLostError, get_job_queue
+from .utils.openai_client import openai_breaker
+
+
+@contextmanager
+def _keep_lease(queue, job):
+    """
+    Renew the job's lease in the background while a stage runs, so a slow
+    stage doesn't let another worker claim the job.
+    """
+    stop = threading.Event()
+
+    def renew():
+        while not stop.wait(queue.lease_seconds / 3):
+            try:
+                queue.heartbeat(job["id"], job["token"])
+            except LeaseLostError as e:
+                print(f"Job {job['id']}: {str(e)}")
+                return
+
+    thread = threading.Thread(target=renew, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+@metrics.traced("article")
+def process_job(queue, job):
+    """
+    Run the stages a job hasn't finished yet, checkpointing after each one.
+    Raises LeaseLostError if another worker has taken the job over.
+    """
+    state = job["state"]
+    state.setdefault("url", job["url"])
+    last_stage = job["stage"]
+    start = STAGES.index(last_stage) + 1 if last_stage else 0
+
+    for stage in STAGES[start:]:
+        print(f"Job {job['id']}: running {stage}")
+        with _keep_lease(queue, job):
+            STAGE_FUNCTIONS[stage](
+                state,
+                lambda: queue.checkpoint(job["id"], job["token"], last_stage, state),
+            )
+        queue.checkpoint(job["id"], job["token"], stage, state)
+        last_stage = stage
+
+
+def run_worker(
+    worker_id: str = None, stop_when_idle: bool = False, metrics_port: int = 0
+):
+    """
+    Claim and process jobs until stopped, or until the queue is empty if
+    `stop_when_idle` is set. Metrics are served on `metrics_port` unless it is 0.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    queue = get_job_queue()
+    metrics.start_metrics_server(metrics_port)
+    print(f"Worker {worker_id} started")
+
+    while True:
+        # leave jobs queued while OpenAI is failing instead of burning their attempts
+        if openai_breaker.is_open():
+            time.sleep(openai_breaker.retry_after())
+            continue
+
+        job = queue.claim(worker_id)
+        if job is None:
+            if stop_when_idle:
+                return
+            time.sleep(JOB_POLL_INTERVAL)
+            continue
+
+        try:
+            process_job(queue, job)
+            queue.complete(job["id"], job["token"])
+            metrics.inc("jobs_total", status=DONE)
+            print(f"Job {job['id']}: done")
+        except LeaseLostError as e:
+            # the job's new owner records its outcome
+            metrics.inc("jobs_total", status="lease_lost")
+            print(f"Job {job['id']}: abandoned ({str(e)})")
+        except Exception as e:
+            try:
+                status = queue.fail(job["id"], job["token"], str(e))
+            except LeaseLostError:
+                status = "lease_lost"
+            metrics.inc("jobs_total", status=status)
+            print(f"Job {job['id']}: failed ({status}): {str(e)}")
+
+
+def run_workers(n_workers: int = JOB_WORKERS):
+    """
+    Start `n_workers` worker processes and wait for them.
+    """
+    require_env(*OPENAI_VARS, *AIRTABLE_VARS)
+    # each process has its own metrics, on the ports after the bot's
+    processes = [
+        multiprocessing.Process(
+            target=run_worker,
+            name=f"worker-{i}",
+            kwargs={"metrics_port": METRICS_PORT + 1 + i if METRICS_PORT else 0},
+        )
+        for i in range(n_workers)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()